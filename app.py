@@ -1,131 +1,164 @@
-from datetime import date
+import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-import joblib
+import numpy as np
 import pandas as pd
-import shap
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from redis import Redis
 
-from nhl_match_prediction.modeling.models.logistic import prepare_data
-from nhl_match_prediction.upcoming_features.build_upcoming_matches import get_upcoming_matches
+from nhl_match_prediction.serving.cache import PredictionCache
+from nhl_match_prediction.serving.executor import CoalescingExecutor
+from nhl_match_prediction.serving.feed import FeedCache
+from nhl_match_prediction.serving.predictions import THRESHOLD, build_predictions
+from nhl_match_prediction.serving.registry import ModelNotReadyError, ModelRegistry
+from nhl_match_prediction.serving.store import RedisPredictionStore, dumps, publish_update
+from nhl_match_prediction.upcoming_features.build_upcoming_matches import (
+    get_upcoming_matches,
+    get_upcoming_version,
+)
 from nhl_match_prediction.visualization.daily_accuracy import load_data, prepare_predictions
 from scripts.tasks import router as tasks_router
 
 # INIT
-app = FastAPI()
-app.include_router(tasks_router)
+MODEL_NAME = "logistic"
+SHAP_BACKGROUND_PATH = Path(__file__).parent / "data/processed/shap_background.joblib"
+CONTENT_DIR = Path(__file__).parent / "content"
 
 client = Redis(host="redis")
 
-MODEL_PATH = Path(__file__).parent / "logs/logistic/model2.joblib"
-CONTENT_DIR = Path(__file__).parent / "content"
-THRESHOLD = 0.5
+# блокирующая работа уходит в отдельный пул, не в общий threadpool starlette
+serving_executor = CoalescingExecutor(max_workers=int(os.getenv("SERVING_WORKERS", "4")))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # модель и SHAP грузятся в фоне, сервер начинает отвечать сразу
+    registry.start()
+    yield
+    registry.stop()
+    serving_executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(tasks_router)
+
+
+# STATIC
+app.mount("/js", StaticFiles(directory=CONTENT_DIR / "js"), name="js")
+
+
+def compute_predictions(model=None, explainer=None) -> list[dict]:
+    df = get_upcoming_matches()
+    if df.empty:
+        return []
 
-model = joblib.load(MODEL_PATH)
+    if model is None:
+        model, explainer = registry.get()
 
+    return build_predictions(df, model, explainer)
 
-# SHAP INIT
-sample_df = get_upcoming_matches()
 
-if not sample_df.empty:
-    sample_df = sample_df.rename(
-        columns={"home_logo": "home_team_logo", "away_logo": "away_team_logo"}
+def predictions_version(model_version: str | None = None) -> str:
+    return f"{get_upcoming_version()}:{model_version or registry.version}"
+
+
+def warm_predictions(model_version: str, model, explainer):
+    if explainer is None:
+        # предстоящих матчей нет — прогревать нечего
+        return
+
+    # новая модель подменит старую, когда её прогнозы уже будут в кэше
+    prediction_cache.prime(
+        predictions_version(model_version), lambda: compute_predictions(model, explainer)
     )
-    x_sample, _ = prepare_data(sample_df.drop(columns=["home_team_logo", "away_team_logo"]))
-    if not x_sample.empty:
-        x_sample = x_sample.sample(min(50, len(x_sample)))
-    else:
-        raise ValueError("No data for SHAP background")
-else:
-    x_sample = pd.DataFrame()
 
-model_estimator = model.named_steps["logreg"] if hasattr(model, "named_steps") else model
 
-explainer = shap.LinearExplainer(model_estimator, x_sample)
+def announce_model(model_version: str):
+    # прогрев мог взять прогнозы из Redis без публикации, бот же ждёт события
+    publish_update({"model_version": model_version}, client)
 
 
-# STATIC
-app.mount("/js", StaticFiles(directory=CONTENT_DIR / "js"), name="js")
+registry = ModelRegistry(
+    MODEL_NAME,
+    SHAP_BACKGROUND_PATH,
+    get_upcoming_matches,
+    on_load=warm_predictions,
+    on_switch=announce_model,
+)
 
+prediction_cache = PredictionCache(
+    compute_predictions, predictions_version, store=RedisPredictionStore(client)
+)
 
-def predict_with_explain(df: pd.DataFrame):
-    df = df.copy()
+feed_cache = FeedCache()
 
-    x, _ = prepare_data(df.drop(columns=["home_team_logo", "away_team_logo"]))
 
-    probs = model.predict_proba(x)[:, 1]
-    shap_values = explainer.shap_values(x)
+def json_response(content) -> Response:
+    # orjson вместо jsonable_encoder + json.dumps: объяснения делают ответы большими
+    return Response(dumps(content), media_type="application/json")
 
-    results = []
 
-    for i in range(len(df)):
-        feature_impacts = dict(zip(x.columns, shap_values[i], strict=False))
+def etag_response(request: Request, payload: bytes, etag: str) -> Response:
+    # если копия клиента актуальна, отдаём пустой 304
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
 
-        top_features = sorted(feature_impacts.items(), key=lambda x: abs(x[1]), reverse=True)[:10]
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
 
-        total = sum(abs(v) for _, v in top_features) or 1
+    return Response(payload, media_type="application/json", headers=headers)
 
-        explanation = [
-            {
-                "feature": f,
-                "impact": float(v),
-                "impact_percent": round(abs(v) / total * 100, 1),
-                "direction": "positive" if v > 0 else "negative",
-            }
-            for f, v in top_features
-        ]
 
-        results.append(
-            {
-                "probability": float(probs[i]),
-                "prediction": int(probs[i] > THRESHOLD),
-                "explanation": explanation,
-            }
-        )
+async def get_snapshot():
+    return await serving_executor.run("predictions", prediction_cache.get)
 
-    return results
-
-
-def format_response(df: pd.DataFrame, preds: list):
-    output = []
-
-    for i, row in df.iterrows():
-        output.append(
-            {
-                "game_id": row["game_id"],
-                "game_date": row["game_date"],
-                "home_team_abbr": row["home_team_abbr"],
-                "away_team_abbr": row["away_team_abbr"],
-                "home_team_logo": row["home_team_logo"],
-                "away_team_logo": row["away_team_logo"],
-                "arena": row["arena"],
-                "prediction": preds[i]["prediction"],
-                "prediction_prob": preds[i]["probability"],
-                "explanation": preds[i]["explanation"],
-            }
-        )
 
-    return output
+def compute_accuracy():
+    df = load_data()
+
+    df["game_day"] = pd.to_datetime(df["game_day"])
+
+    cutoff = df["game_day"].max() - pd.Timedelta(days=30)
+    df = df[df["game_day"] >= cutoff]
+
+    if df.empty:
+        return {"accuracy": 0}
+
+    df = prepare_predictions(df, THRESHOLD)
 
+    accuracy = (df["correct"].sum() / len(df)) * 100
 
-def prepare_matches(df: pd.DataFrame):
-    df = df.rename(columns={"home_logo": "home_team_logo", "away_logo": "away_team_logo"})
+    return {"accuracy": round(accuracy, 1)}
 
-    df["game_date"] = pd.to_datetime(df["game_date"], utc=True)
-    df["game_date"] = df["game_date"].dt.strftime("%Y-%m-%dT%H:%M:%SZ")
 
-    return df.reset_index(drop=True)
+def upcoming_matches_records():
+    return get_upcoming_matches().to_dict(orient="records")
 
 
 # ROUTES
 @app.get("/health")
-def health():
+async def health():
     return {"message": "Healthy!"}
 
 
+@app.get("/ready")
+async def ready():
+    if not registry.ready:
+        return JSONResponse(
+            status_code=503, content={"status": "not ready", "error": registry.error}
+        )
+
+    return {"status": "ready", "model_version": registry.version}
+
+
+@app.exception_handler(ModelNotReadyError)
+async def model_not_ready_handler(request: Request, exc: ModelNotReadyError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
 # @app.get("/")
 # def test():
 #     return {"message": "Hello, World!"}
@@ -155,133 +188,60 @@ def put_redis(x: str):
 
 
 @app.get("/get_upcoming_matches")
-def get_upcoming_matches_api():
-    df = get_upcoming_matches()
-    return df.to_dict(orient="records")
+async def get_upcoming_matches_api():
+    return await serving_executor.run("upcoming_matches", upcoming_matches_records)
 
 
 @app.get("/predict_upcoming")
-def predict_upcoming():
-    df = get_upcoming_matches()
+async def predict_upcoming(request: Request):
+    snapshot = await get_snapshot()
 
-    if df.empty:
+    if not snapshot.matches:
         return {"message": "No upcoming games"}
 
-    df = prepare_matches(df)
-
-    preds = predict_with_explain(df)
-
-    return format_response(df, preds)
+    return etag_response(request, snapshot.payload, snapshot.etag)
 
 
 @app.get("/predict_today")
-def predict_today():
-    df = get_upcoming_matches()
+async def predict_today():
+    snapshot = await get_snapshot()
 
-    if df.empty:
+    if not snapshot.matches:
         return {"message": "No upcoming games"}
 
-    df = df.rename(columns={"home_logo": "home_team_logo", "away_logo": "away_team_logo"})
-    df["game_date"] = pd.to_datetime(df["game_date"])
+    today = pd.Timestamp.utcnow().date()
+    matches = snapshot.select(snapshot.game_dates.date == today)
 
-    today = pd.Timestamp(date.today())
-    df_today = df[df["game_date"].dt.date == today.date()]
-
-    if df_today.empty:
+    if not matches:
         return {"message": "No games today"}
 
-    df_today = prepare_matches(df_today)
-
-    preds = predict_with_explain(df_today)
-
-    return format_response(df_today, preds)
+    return json_response(matches)
 
 
 @app.get("/predict_feed")
-def predict_feed():
-    df = get_upcoming_matches()
+async def predict_feed(request: Request):
+    snapshot = await get_snapshot()
 
-    if df.empty:
+    if not snapshot.matches:
         return {"message": "No upcoming games"}
 
-    df = df.rename(columns={"home_logo": "home_team_logo", "away_logo": "away_team_logo"})
-    df["game_date"] = pd.to_datetime(df["game_date"], utc=True)
-
-    now = pd.Timestamp.utcnow()
-
-    today = now.date()
-    tomorrow = (now + pd.Timedelta(days=1)).date()
-
-    # --- LIVE (начался, но считаем что ещё идёт)
-    df_live = df[
-        (df["game_date"].dt.date == today)
-        & (df["game_date"] <= now)
-        & (df["game_date"] >= now - pd.Timedelta(hours=3))
-    ]
-
-    # --- TODAY upcoming
-    df_today_upcoming = df[(df["game_date"].dt.date == today) & (df["game_date"] > now)]
-
-    # --- TOMORROW
-    df_tomorrow = df[df["game_date"].dt.date == tomorrow]
-
-    def process(df_part):
-        if df_part.empty:
-            return []
-
-        df_part = prepare_matches(df_part)
-        preds = predict_with_explain(df_part)
-        return format_response(df_part, preds)
-
-    return {
-        "live": process(df_live),
-        "today_upcoming": process(df_today_upcoming),
-        "tomorrow": process(df_tomorrow),
-    }
+    payload, etag = feed_cache.get(snapshot)
+    return etag_response(request, payload, etag)
 
 
 @app.get("/upcoming_preview")
-def upcoming_preview():
-    df = get_upcoming_matches()
-
-    if df.empty:
-        return []
-
-    df = df.rename(columns={"home_logo": "home_team_logo", "away_logo": "away_team_logo"})
-    df["game_date"] = pd.to_datetime(df["game_date"], utc=True)
-
-    now = pd.Timestamp.utcnow()
-    df = df[df["game_date"] > now]
-    df = df.sort_values("game_date")
-
-    df = df.head(2)
-    if df.empty:
-        return []
+async def upcoming_preview():
+    snapshot = await get_snapshot()
 
-    df = prepare_matches(df)
+    upcoming = np.flatnonzero(snapshot.game_dates > pd.Timestamp.utcnow())
+    upcoming = upcoming[np.argsort(snapshot.game_dates[upcoming], kind="stable")][:2]
 
-    preds = predict_with_explain(df)
-
-    return format_response(df, preds)
+    return json_response([snapshot.matches[i] for i in upcoming])
 
 
 @app.get("/accuracy")
-def get_accuracy():
-    df = load_data()
-
-    df["game_day"] = pd.to_datetime(df["game_day"])
-
-    cutoff = df["game_day"].max() - pd.Timedelta(days=30)
-    df = df[df["game_day"] >= cutoff]
-
-    if df.empty:
-        return {"accuracy": 0}
-
-    df = prepare_predictions(df, THRESHOLD)
-
-    accuracy = (df["correct"].sum() / len(df)) * 100
-
-    return {"accuracy": round(accuracy, 1)}
+async def get_accuracy():
+    return await serving_executor.run("accuracy", compute_accuracy)
 
 
 @app.get("/subscribers")
@@ -1,10 +1,16 @@
 import asyncio
+import logging
 import os
+import time
 
 import aiohttp
 from aiogram import Bot, Dispatcher, types
 from aiogram.filters import Command
 from dotenv import load_dotenv
+from redis import RedisError
+from redis.asyncio import Redis
+
+from nhl_match_prediction.serving.store import UPDATES_CHANNEL
 
 load_dotenv()
 
@@ -13,6 +19,13 @@ if not BOT_TOKEN:
     raise ValueError("BOT_TOKEN is not set in environment variables")
 
 API_URL = os.getenv("API_URL")
+REDIS_HOST = os.getenv("REDIS_HOST", "redis")
+
+CACHE_TTL = 30
+# сколько после истечения TTL ещё можно отдать устаревшую копию, обновляя её в фоне
+MAX_STALE = 4 * CACHE_TTL
+
+logger = logging.getLogger(__name__)
 
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
@@ -33,15 +46,87 @@ async def on_startup(bot: Bot):
     await bot.set_chat_menu_button(menu_button=types.MenuButtonCommands())
 
 
-async def fetch_json(session: aiohttp.ClientSession, url: str):
-    async with session.get(url, timeout=10) as resp:
-        resp.raise_for_status()
-        return await resp.json()
+class BackendClient:
+    """
+    Доступ бота к API: один aiohttp-сеанс на всё время работы бота
+    и кэш GET-ответов на CACHE_TTL секунд.
+
+    Одновременные запросы одного адреса ждут общий запрос к API (single-flight),
+    по истечении TTL ответ перепроверяется через If-None-Match.
+    """
+
+    def __init__(self, base_url: str, ttl: float = CACHE_TTL, max_stale: float = MAX_STALE):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._session: aiohttp.ClientSession | None = None
+        self._cache: dict[str, tuple[float, dict, str | None]] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def get_json(self, path: str, allow_stale: bool = False):
+        """
+        allow_stale: устаревшая копия отдаётся сразу, обновление идёт в фоне.
+        Подходит для данных, которые и так обновляются по событиям из Redis.
+        Копия старше TTL + max_stale (бот простаивал) запрашивается синхронно:
+        в ней могли остаться уже сыгранные матчи.
+        """
+        entry = self._cache.get(path)
+
+        if entry is not None:
+            now = time.monotonic()
+
+            if entry[0] > now:
+                return entry[1]
+            if allow_stale and entry[0] + self.max_stale > now:
+                self._start_refresh(path)
+                return entry[1]
+
+        return await self.refresh(path)
+
+    async def refresh(self, path: str):
+        return await asyncio.shield(self._start_refresh(path))
+
+    def _start_refresh(self, path: str) -> asyncio.Task:
+        task = self._inflight.get(path)
+
+        if task is None:
+            task = asyncio.create_task(self._refresh(path, self._cache.get(path)))
+            self._inflight[path] = task
+            task.add_done_callback(lambda t: self._on_refreshed(path, t))
+
+        return task
+
+    def _on_refreshed(self, path: str, task: asyncio.Task):
+        self._inflight.pop(path, None)
+
+        # фоновое обновление никто не ждёт, поэтому ошибку только логируем
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Failed to refresh %s: %r", path, task.exception())
+
+    async def _refresh(self, path: str, entry):
+        headers = {"If-None-Match": entry[2]} if entry is not None and entry[2] else {}
+
+        async with self._session.get(f"{self.base_url}{path}", headers=headers) as resp:
+            if resp.status == 304:  # noqa: PLR2004
+                data = entry[1]
+            else:
+                resp.raise_for_status()
+                data = await resp.json()
+
+            self._cache[path] = (time.monotonic() + self.ttl, data, resp.headers.get("ETag"))
 
+        return data
 
-async def post_request(session: aiohttp.ClientSession, url: str):
-    async with session.post(url, timeout=10) as resp:
-        return resp.status
+    async def post(self, path: str) -> int:
+        async with self._session.post(f"{self.base_url}{path}") as resp:
+            return resp.status
 
 
 @dp.message(Command("start"))
@@ -57,41 +142,39 @@ async def start(message: types.Message):
 
 
 @dp.message(Command("subscribe"))
-async def subscribe(message: types.Message):
+async def subscribe(message: types.Message, api: BackendClient):
     chat_id = message.chat.id
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            status = await post_request(session, f"{API_URL}/subscribe/{chat_id}")
+    try:
+        status = await api.post(f"/subscribe/{chat_id}")
 
-            if status == 200:  # noqa: PLR2004
-                await message.answer("✅ Ты подписался на уведомления!")
-            else:
-                await message.answer("❌ Ошибка подписки")
+        if status == 200:  # noqa: PLR2004
+            await message.answer("✅ Ты подписался на уведомления!")
+        else:
+            await message.answer("❌ Ошибка подписки")
 
-        except Exception as e:
-            await message.answer(f"Ошибка: {e}")
+    except Exception as e:
+        await message.answer(f"Ошибка: {e}")
 
 
 @dp.message(Command("unsubscribe"))
-async def unsubscribe(message: types.Message):
+async def unsubscribe(message: types.Message, api: BackendClient):
     chat_id = message.chat.id
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            status = await post_request(session, f"{API_URL}/unsubscribe/{chat_id}")
+    try:
+        status = await api.post(f"/unsubscribe/{chat_id}")
 
-            if status == 200:  # noqa: PLR2004
-                await message.answer("❌ Ты отписался от уведомлений")
-            else:
-                await message.answer("❌ Ошибка отписки")
+        if status == 200:  # noqa: PLR2004
+            await message.answer("❌ Ты отписался от уведомлений")
+        else:
+            await message.answer("❌ Ошибка отписки")
 
-        except Exception as e:
-            await message.answer(f"Ошибка: {e}")
+    except Exception as e:
+        await message.answer(f"Ошибка: {e}")
 
 
 @dp.message(Command("upcoming_matches"))
-async def upcoming(message: types.Message):
+async def upcoming(message: types.Message, api: BackendClient):
     def format_games(games, title):
         if not games:
             return ""
@@ -113,41 +196,84 @@ async def upcoming(message: types.Message):
 
         return text
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            res = await fetch_json(session, f"{API_URL}/predict_feed")
+    try:
+        res = await api.get_json("/predict_feed", allow_stale=True)
 
-            if "message" in res:
-                await message.answer(res["message"])
-                return
+        if "message" in res:
+            await message.answer(res["message"])
+            return
 
-            text = ""
-            text += format_games(res.get("live", []), "🔴 ===== LIVE ===== 🔴")
-            text += "\n"
-            text += format_games(res.get("today_upcoming", []), "🟢 ===== Сегодня ===== 🟢")
-            text += "\n"
-            text += format_games(res.get("tomorrow", []), "🔵 ===== Завтра ===== 🔵")
+        text = ""
+        text += format_games(res.get("live", []), "🔴 ===== LIVE ===== 🔴")
+        text += "\n"
+        text += format_games(res.get("today_upcoming", []), "🟢 ===== Сегодня ===== 🟢")
+        text += "\n"
+        text += format_games(res.get("tomorrow", []), "🔵 ===== Завтра ===== 🔵")
 
-            await message.answer(text or "Нет матчей 😢")
+        await message.answer(text or "Нет матчей 😢")
 
-        except Exception as e:
-            await message.answer(f"Ошибка: {e}")
+    except Exception as e:
+        await message.answer(f"Ошибка: {e}")
 
 
 @dp.message(Command("accuracy"))
-async def accuracy(message: types.Message):
-    async with aiohttp.ClientSession() as session:
+async def accuracy(message: types.Message, api: BackendClient):
+    try:
+        res = await api.get_json("/accuracy")
+        await message.answer(f"📈 Accuracy: {res['accuracy']}%")
+
+    except Exception as e:
+        await message.answer(f"Ошибка: {e}")
+
+
+async def listen_prediction_updates(api: BackendClient):
+    """
+    Обновляет локальную копию /predict_feed по событиям бэкенда в Redis.
+    Задачу никто не ждёт, поэтому любая ошибка логируется и подписка
+    переподключается, иначе бот молча перестал бы получать обновления.
+    """
+    client = Redis(host=REDIS_HOST)
+
+    while True:
         try:
-            res = await fetch_json(session, f"{API_URL}/accuracy")
-            await message.answer(f"📈 Accuracy: {res['accuracy']}%")
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(UPDATES_CHANNEL)
+
+                # пока не были подписаны, обновление могло пройти мимо
+                await refresh_feed(api)
+
+                async for event in pubsub.listen():
+                    if event["type"] == "message":
+                        await refresh_feed(api)
+
+        except RedisError:
+            logger.exception("Redis subscription lost, reconnecting")
+            await asyncio.sleep(5)
+
+        except Exception:
+            logger.exception("Prediction updates listener failed, restarting")
+            await asyncio.sleep(5)
 
-        except Exception as e:
-            await message.answer(f"Ошибка: {e}")
+
+async def refresh_feed(api: BackendClient):
+    try:
+        await api.refresh("/predict_feed")
+    except Exception:
+        # кроме ClientError: таймаут ClientTimeout — это TimeoutError, ответ может быть не JSON
+        logger.exception("Failed to refresh predictions feed")
 
 
 async def main():
     await on_startup(bot)
-    await dp.start_polling(bot)
+
+    # api попадает в хендлеры через workflow data aiogram
+    async with BackendClient(API_URL) as api:
+        listener = asyncio.create_task(listen_prediction_updates(api))
+
+        try:
+            await dp.start_polling(bot, api=api)
+        finally:
+            listener.cancel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
+
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA mmap_size=268435456;",  # 256 MB: чтение страниц без копирования в page cache
+    "PRAGMA busy_timeout=5000;",
+]
+
+# кэш страниц на соединение; отрицательное значение — размер в KiB.
+# Соединения пула живут долго и их до POOL_SIZE + 1 на процесс, поэтому кэш ограничен 64 MB;
+# большой кэш (страниц, как раньше в ETL-скриптах) — только для разовых пакетных соединений
+POOL_CACHE_SIZE = -65536
+BATCH_CACHE_SIZE = 1000000
+
+# подготовленные выражения, которые sqlite3 держит на каждом соединении
+STATEMENT_CACHE = 256
+POOL_SIZE = 8
+
+
+def connect(
+    path: Path = DB_PATH, query_only: bool = False, cache_size: int = POOL_CACHE_SIZE
+) -> sqlite3.Connection:
+    """
+    Новое соединение, для которого выставлены общие PRAGMA.
+    check_same_thread=False: соединения пула переходят между потоками.
+    """
+    con = sqlite3.connect(
+        str(path), cached_statements=STATEMENT_CACHE, check_same_thread=False, timeout=5
+    )
+
+    for pragma in PRAGMAS:
+        con.execute(pragma)
+
+    con.execute(f"PRAGMA cache_size={cache_size};")
+
+    if query_only:
+        con.execute("PRAGMA query_only=ON;")
+
+    return con
+
+
+class ConnectionPool:
+    """
+    Пул читающих соединений и одно пишущее соединение на процесс.
+
+    Читающее соединение в каждый момент занято одним потоком, запись
+    сериализуется локом. После fork (Celery prefork) пул пересоздаётся,
+    чтобы дочерний процесс не унаследовал чужие соединения.
+    """
+
+    def __init__(self, path: Path = DB_PATH, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._writer: sqlite3.Connection | None = None
+        self._write_lock = threading.Lock()
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                return connect(self.path, query_only=True)
+
+        return self._idle.get()
+
+    @contextmanager
+    def reader(self):
+        self._check_fork()
+        con = self._acquire()
+
+        try:
+            yield con
+        finally:
+            if con.in_transaction:
+                con.rollback()
+            self._idle.put(con)
+
+    @contextmanager
+    def writer(self):
+        """Единственный писатель процесса: commit при успехе, rollback при ошибке"""
+        self._check_fork()
+
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = connect(self.path)
+
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+
+_pools: dict[Path, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: Path = DB_PATH) -> ConnectionPool:
+    path = Path(path)
+
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+
+def reader(path: Path = DB_PATH):
+    return get_pool(path).reader()
+
+
+def writer(path: Path = DB_PATH):
+    return get_pool(path).writer()
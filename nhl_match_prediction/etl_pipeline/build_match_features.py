@@ -1,41 +1,22 @@
 import sqlite3
 from pathlib import Path
 
+from nhl_match_prediction.db import BATCH_CACHE_SIZE, connect
+from nhl_match_prediction.schema import create_indexes
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
 
 
 def build_match_features() -> None:
-    con = sqlite3.connect(str(DB_PATH))
+    con = connect(DB_PATH, cache_size=BATCH_CACHE_SIZE)
     con.row_factory = sqlite3.Row
-    con.execute("PRAGMA journal_mode=WAL;")
-    con.execute("PRAGMA synchronous=NORMAL;")
-    con.execute("PRAGMA temp_store=MEMORY;")
-    con.execute("PRAGMA cache_size=1000000;")
 
     # ------------------------------------------------------------------------------------------
     # INDEXES
     # ------------------------------------------------------------------------------------------
 
-    con.execute("""
-        CREATE INDEX IF NOT EXISTS idx_tgs_game_id
-        ON team_game_stats(game_id);
-    """)
-
-    con.execute("""
-        CREATE INDEX IF NOT EXISTS idx_games_game_id
-        ON games(game_id);
-    """)
-
-    con.execute("""
-        CREATE INDEX IF NOT EXISTS idx_tgs_team_season_date
-        ON team_game_stats(team_id, game_id);
-    """)
-
-    con.execute("""
-        CREATE INDEX IF NOT EXISTS idx_games_date
-        ON games(game_id, date, season);
-    """)
+    create_indexes(con, ["games", "team_game_stats", "standings_daily"])
 
     # ------------------------------------------------------------------------------------------
     # TEAM GAME STATS
@@ -174,11 +155,6 @@ def build_match_features() -> None:
         ON team_game_stats_features(team_abbr, season, game_date);
     """)
 
-    con.execute("""
-        CREATE INDEX IF NOT EXISTS idx_standings_lookup
-        ON standings_daily(team_abbrev, season_id, date);
-    """)
-
     # ------------------------------------------------------------------------------------------
     # STANDINGS DAILY
     # ------------------------------------------------------------------------------------------
@@ -928,6 +904,8 @@ def build_match_features() -> None:
 
     print("✅ MATCH FEATURES done!")
 
+    create_indexes(con, ["match_features"])
+
     con.commit()
     con.close()
 
@@ -1,8 +1,9 @@
-import sqlite3
 from pathlib import Path
 
 import pandas as pd
 
+from nhl_match_prediction.db import reader
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 
 DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
@@ -12,16 +13,14 @@ OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 
 def main():
-    conn = sqlite3.connect(DB_PATH)
-
     query = """
     SELECT * FROM match_features
     """
 
-    df = pd.read_sql(query, conn)
-    df.to_csv(OUT_PATH, index=False)
+    with reader(DB_PATH) as conn:
+        df = pd.read_sql(query, conn)
 
-    conn.close()
+    df.to_csv(OUT_PATH, index=False)
 
     print(f"Exported {len(df)} rows to {OUT_PATH}")
 
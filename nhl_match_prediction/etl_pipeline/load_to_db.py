@@ -3,6 +3,8 @@ from pathlib import Path
 
 import pandas as pd
 
+from nhl_match_prediction.schema import create_indexes
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 
 DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
@@ -36,6 +38,7 @@ def main():
         df = pd.read_csv(file_path, low_memory=False)
 
         df.to_sql(table_name, conn, if_exists="replace", index=False, chunksize=50_000)
+        create_indexes(conn, [table_name])
 
     conn.close()
     print("All tables loaded into SQLite")
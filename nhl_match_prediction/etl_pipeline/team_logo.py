@@ -1,9 +1,11 @@
-import sqlite3
 from datetime import date
 from pathlib import Path
 
 import pandas as pd
 
+from nhl_match_prediction.db import writer
+from nhl_match_prediction.schema import create_indexes
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
 SEASON_END = 7
@@ -23,40 +25,34 @@ season_id = f"{season_start}{season_end}"
 
 
 def create_team_logo_table():
-    con = sqlite3.connect(DB_PATH)
+    with writer(DB_PATH) as con:
+        con.execute("""DROP TABLE IF EXISTS team_logo;""")
 
-    con.execute("""DROP TABLE IF EXISTS team_logo;""")
+        con.execute("""
+        CREATE TABLE IF NOT EXISTS team_logo (
+            team_abbr TEXT PRIMARY KEY,
+            team_name TEXT,
+            logo_url TEXT
+        )
+        """)
 
-    con.execute("""
-    CREATE TABLE IF NOT EXISTS team_logo (
-        team_abbr TEXT PRIMARY KEY,
-        team_name TEXT,
-        logo_url TEXT
-    )
-    """)
 
-    con.commit()
-    con.close()
+TEAM_LOGO_QUERY = """
+    SELECT DISTINCT
+        team_abbrev as team_abbr,
+        team_name as team_name,
+        team_logo as logo_url
+    FROM standings_daily
+    WHERE season_id = ?
+"""
 
 
 def populate_team_logo():
-    con = sqlite3.connect(DB_PATH)
-
-    df = pd.read_sql_query(
-        f"""
-        SELECT DISTINCT
-            team_abbrev as team_abbr,
-            team_name as team_name,
-            team_logo as logo_url
-        FROM standings_daily
-        WHERE season_id = '{season_id}'
-    """,
-        con,
-    )
-
-    df.to_sql("team_logo", con, if_exists="replace", index=False)
-
-    con.close()
+    with writer(DB_PATH) as con:
+        df = pd.read_sql_query(TEAM_LOGO_QUERY, con, params=(season_id,))
+
+        df.to_sql("team_logo", con, if_exists="replace", index=False)
+        create_indexes(con, ["team_logo"])
 
 
 if __name__ == "__main__":
@@ -3,134 +3,145 @@ import pandas as pd
 
 FULL_GAME_MINUTES = 59
 
+GROUP_KEYS = ["game_id", "team_id", "season"]
 
-def process_teams(g, row):
-    # =========================
-    # TEAM TOTALS
-    # =========================
 
-    team_points_total = g["total_points"].sum(skipna=True)
+def top_n_by_group(df, by, n):
+    """
+    n лучших строк каждой группы по колонке by (по убыванию, NaN в конце).
 
-    row["team_points_total"] = team_points_total
-    row["team_points_std"] = g["total_points"].std(skipna=True)
+    При равенстве значений берутся строки в исходном порядке.
+    """
+    ordered = df.sort_values(
+        ["_gid", by], ascending=[True, False], na_position="last", kind="stable"
+    )
+    return ordered[ordered.groupby("_gid").cumcount() < n]
 
-    row["hits_sum"] = g["hits"].sum(skipna=True)
-    row["pim_sum"] = g["pim"].sum(skipna=True)
-    row["takeaways_sum"] = g["takeaways"].sum(skipna=True)
-    row["giveaways_sum"] = g["giveaways"].sum(skipna=True)
-    row["faceoff_avg"] = g["faceoffWinningPctg"].mean(skipna=True)
 
-    row["pp_goals_team_sum"] = g["powerPlayGoals"].sum(skipna=True)
-    row["team_last5_points_sum"] = g["last_n_games_points"].sum(skipna=True)
+def process_teams(df):
+    # =========================
+    # TEAM TOTALS
+    # =========================
 
-    return team_points_total
+    return df.groupby("_gid").agg(
+        team_points_total=("total_points", "sum"),
+        team_points_std=("total_points", "std"),
+        hits_sum=("hits", "sum"),
+        pim_sum=("pim", "sum"),
+        takeaways_sum=("takeaways", "sum"),
+        giveaways_sum=("giveaways", "sum"),
+        faceoff_avg=("faceoffWinningPctg", "mean"),
+        pp_goals_team_sum=("powerPlayGoals", "sum"),
+        team_last5_points_sum=("last_n_games_points", "sum"),
+    )
 
 
-def process_skaters(g, row, team_points_total):
+def process_skaters(df, team_points_total):
     # =========================
     # SKATERS
     # =========================
 
-    skaters = g[g["position"] != "G"]
+    skaters = df[df["position"] != "G"]
+    top3 = top_n_by_group(skaters, "total_points", 3)
 
-    if not skaters.empty:
-        top3 = skaters.sort_values("total_points", ascending=False).head(3)
+    out = top3.groupby("_gid").agg(
+        top3_points_sum=("total_points", "sum"),
+        top3_goals_sum=("total_goals", "sum"),
+        top3_assists_sum=("total_assists", "sum"),
+        top3_toi_sum=("toi_minutes", "sum"),
+        top3_sog_sum=("sog", "sum"),
+        top3_faceoff_avg=("faceoffWinningPctg", "mean"),
+        top3_last5_points_sum=("last_n_games_points", "sum"),
+        top3_pp_goals_sum=("powerPlayGoals", "sum"),
+    )
 
-        row["top3_points_sum"] = top3["total_points"].sum()
-        row["top3_goals_sum"] = top3["total_goals"].sum()
-        row["top3_assists_sum"] = top3["total_assists"].sum()
-        row["top3_toi_sum"] = top3["toi_minutes"].sum()
-        row["top3_sog_sum"] = top3["sog"].sum()
-        row["top3_faceoff_avg"] = top3["faceoffWinningPctg"].mean()
+    total = team_points_total.reindex(out.index).to_numpy(dtype=float)
+    points = out["top3_points_sum"].to_numpy(dtype=float)
 
-        row["top3_last5_points_sum"] = top3["last_n_games_points"].sum()
-        row["top3_pp_goals_sum"] = top3["powerPlayGoals"].sum()
+    out["top3_points_ratio"] = np.divide(points, total, out=np.zeros(len(out)), where=total > 0)
 
-        row["top3_points_ratio"] = (
-            row["top3_points_sum"] / team_points_total if team_points_total > 0 else 0
-        )
+    return out
 
 
-def process_defence(g, row):
+def process_defence(df):
     # =========================
     # DEFENSE
     # =========================
 
-    defense = g[g["position"] == "D"]
-
-    if not defense.empty:
-        top2_def = defense.sort_values("toi_minutes", ascending=False).head(2)
+    defense = df[df["position"] == "D"]
+    top2_def = top_n_by_group(defense, "toi_minutes", 2)
 
-        row["top2_defense_blocked_sum"] = top2_def["blockedShots"].sum()
-        row["top2_defense_hits_sum"] = top2_def["hits"].sum()
-        row["top2_defense_toi_sum"] = top2_def["toi_minutes"].sum()
-        row["top2_defense_points_sum"] = top2_def["total_points"].sum()
-        row["top2_defense_pp_goals"] = top2_def["powerPlayGoals"].sum()
+    out = top2_def.groupby("_gid").agg(
+        top2_defense_blocked_sum=("blockedShots", "sum"),
+        top2_defense_hits_sum=("hits", "sum"),
+        top2_defense_toi_sum=("toi_minutes", "sum"),
+        top2_defense_points_sum=("total_points", "sum"),
+        top2_defense_pp_goals=("powerPlayGoals", "sum"),
+    )
+    out["defense_hits_sum"] = defense.groupby("_gid")["hits"].sum()
 
-        row["defense_hits_sum"] = defense["hits"].sum()
+    return out
 
 
-def process_forwards(g, row):
+def process_forwards(df):
     # =========================
     # FORWARD AGGREGATES
     # =========================
 
-    forwards = g[g["position"].isin(["C", "L", "R"])]
+    forwards = df[df["position"].isin(["C", "L", "R"])]
 
-    if not forwards.empty:
-        row["forward_points_sum"] = forwards["total_points"].sum()
-        row["avg_forward_faceoff"] = forwards["faceoffWinningPctg"].mean()
+    return forwards.groupby("_gid").agg(
+        forward_points_sum=("total_points", "sum"),
+        avg_forward_faceoff=("faceoffWinningPctg", "mean"),
+    )
 
 
-def process_goalie(g, row):
+def process_goalie(df):
     # =========================
     # GOALIE
     # =========================
 
-    goalies = g[g["position"] == "G"]
-
-    if not goalies.empty:
-        starter = goalies[goalies["starter"]]
+    goalies = df[df["position"] == "G"]
 
-        goalie = (
-            starter.iloc[0]
-            if not starter.empty
-            else goalies.sort_values("toi_minutes", ascending=False).iloc[0]
-        )
+    # первый стартер группы, иначе вратарь, дольше всех бывший на льду
+    starters = goalies[goalies["starter"]].drop_duplicates("_gid")
+    by_toi = top_n_by_group(goalies, "toi_minutes", 1)
 
-        shots = goalie.get("shotsAgainst", np.nan)
-        saves = goalie.get("saves", np.nan)
+    goalie = pd.concat([starters, by_toi]).drop_duplicates("_gid").set_index("_gid")
 
-        save_pct = saves / shots if pd.notna(shots) and shots > 0 else np.nan
+    shots = goalie["shotsAgainst"]
+    saves = goalie["saves"]
 
-        row["goalie_save_pct"] = save_pct
-        row["goalie_goals_against"] = goalie.get("goalsAgainst", np.nan)
-        row["goalie_shots_against"] = shots
-        row["goalie_saves"] = saves
-        row["goalie_toi"] = goalie.get("toi_minutes", np.nan)
-        row["goalie_played_full_game"] = (
-            1 if goalie.get("toi_minutes", 0) >= FULL_GAME_MINUTES else 0
-        )
+    return pd.DataFrame(
+        {
+            "goalie_save_pct": (saves / shots).where(shots > 0),
+            "goalie_goals_against": goalie["goalsAgainst"],
+            "goalie_shots_against": shots,
+            "goalie_saves": saves,
+            "goalie_toi": goalie["toi_minutes"],
+            "goalie_played_full_game": (goalie["toi_minutes"] >= FULL_GAME_MINUTES).astype(int),
+        }
+    )
 
 
 def add_player_features(df: pd.DataFrame) -> pd.DataFrame:
-    features = []
+    df = df.dropna(subset=GROUP_KEYS)
 
-    grouped = df.groupby(["game_id", "team_id", "season"])
+    grouped = df.groupby(GROUP_KEYS)
+    df = df.assign(_gid=grouped.ngroup())
 
-    for (game_id, team_id, season), g in grouped:
-        row = {
-            "game_id": game_id,
-            "team_id": team_id,
-            "season": season,
-        }
+    keys = grouped.size().index.to_frame(index=False)
 
-        team_points_total = process_teams(g, row)
-        process_skaters(g, row, team_points_total)
-        process_defence(g, row)
-        process_forwards(g, row)
-        process_goalie(g, row)
+    teams = process_teams(df)
 
-        features.append(row)
+    features = keys.join(
+        [
+            teams,
+            process_skaters(df, teams["team_points_total"]),
+            process_defence(df),
+            process_forwards(df),
+            process_goalie(df),
+        ]
+    )
 
-    return pd.DataFrame(features)
+    return features.reset_index(drop=True)
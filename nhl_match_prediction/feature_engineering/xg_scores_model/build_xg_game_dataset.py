@@ -1,20 +1,35 @@
 import numpy as np
 import pandas as pd
-from catboost import CatBoostClassifier
 
+from nhl_match_prediction.feature_engineering.xg_scores_model import build_xg_team_dataset
 from nhl_match_prediction.feature_engineering.xg_scores_model.config import (
     LOG_PATH,
-    MODEL_FILE,
     PROCESSED_PATH,
     XG_SHOTS_DATASET_PATH,
 )
 from nhl_match_prediction.feature_engineering.xg_scores_model.logger import setup_logger
+from nhl_match_prediction.feature_engineering.xg_scores_model.scoring import get_scorer
 
 logger = setup_logger("xg_game_dataset", LOG_PATH / "build_game_dataset.log")
 
 
 OUTPUT_PATH = PROCESSED_PATH / "xg_game_dataset.csv"
 
+AGG_COLUMNS = [
+    "game_id",
+    "game_date",
+    "home_team_id",
+    "home_xg",
+    "home_shots",
+    "home_goals",
+    "away_team_id",
+    "away_xg",
+    "away_shots",
+    "away_goals",
+    "home_xg_per_shot",
+    "away_xg_per_shot",
+]
+
 
 # ======================
 # LOAD
@@ -28,48 +43,6 @@ def load_data():
     return df
 
 
-# ======================
-# LOAD MODEL
-# ======================
-def load_model():
-    model = CatBoostClassifier()
-    model.load_model(MODEL_FILE)
-
-    logger.info(f"Loaded xG model from {MODEL_FILE}")
-    return model
-
-
-# ======================
-# PREP FEATURES
-# ======================
-def prepare_features(df, model):
-    feature_names = model.feature_names_
-
-    # categorical
-    for col in ["shot_type", "situation_compact", "prev_event_type"]:
-        df[col] = df[col].fillna("unknown").astype(str)
-
-    # numeric
-    for col in feature_names:
-        if col not in df.columns:
-            continue
-        df[col] = df[col].fillna(0)
-
-    return df[feature_names]
-
-
-# ======================
-# PREDICT XG
-# ======================
-def add_xg(df, model):
-    X = prepare_features(df, model)  # noqa: N806
-    df["xg"] = model.predict_proba(X)[:, 1]
-
-    logger.info("Computed xG for all shots")
-
-    return df
-
-
 # ======================
 # AGGREGATE GAME LEVEL
 # ======================
@@ -116,34 +89,72 @@ def aggregate_games(df):
 # ======================
 # ADD ROLLING FEATURES
 # ======================
-def add_rolling_features(game):
-    game = game.sort_values("game_date").reset_index(drop=True)
+ROLLING_WINDOW = 5
+ROLLING_MIN_PERIODS = 3
+EWM_ALPHA = 0.2
 
-    # EWM
-    game["home_xg_ewm"] = game.groupby("home_team_id")["home_xg"].transform(
-        lambda x: x.shift(1).ewm(alpha=0.2).mean()
-    )
 
-    game["away_xg_ewm"] = game.groupby("away_team_id")["away_xg"].transform(
-        lambda x: x.shift(1).ewm(alpha=0.2).mean()
-    )
+def to_team_games(game):
+    """Long-формат: одна строка на команду в матче (row — позиция матча в game)"""
+    sides = [
+        pd.DataFrame(
+            {
+                "row": game.index,
+                "team_id": game[f"{side}_team_id"].to_numpy(),
+                "is_home": is_home,
+                "xg": game[f"{side}_xg"].to_numpy(),
+                "shots": game[f"{side}_shots"].to_numpy(),
+            }
+        )
+        for side, is_home in (("home", 1), ("away", 0))
+    ]
 
-    # rolling 5
-    game["home_xg_last5"] = game.groupby("home_team_id")["home_xg"].transform(
-        lambda x: x.shift(1).rolling(5, min_periods=3).mean()
-    )
+    long = pd.concat(sides, ignore_index=True)
 
-    game["away_xg_last5"] = game.groupby("away_team_id")["away_xg"].transform(
-        lambda x: x.shift(1).rolling(5, min_periods=3).mean()
-    )
+    return long.sort_values(["team_id", "row"], kind="mergesort").reset_index(drop=True)
 
-    game["home_shots_last5"] = game.groupby("home_team_id")["home_shots"].transform(
-        lambda x: x.shift(1).rolling(5, min_periods=3).mean()
-    )
 
-    game["away_shots_last5"] = game.groupby("away_team_id")["away_shots"].transform(
-        lambda x: x.shift(1).rolling(5, min_periods=3).mean()
-    )
+def team_rolling_stats(long, by_venue=False):
+    """
+    Сдвинутые rolling/EWM статистики по всем командам за один проход.
+
+    by_venue=True — считать отдельно по домашним и выездным матчам команды.
+    """
+    keys = [long["team_id"], long["is_home"]] if by_venue else [long["team_id"]]
+
+    prev = long[["xg", "shots"]].groupby(keys).shift(1)
+    grouped = prev.groupby(keys)
+
+    ewm = grouped["xg"].ewm(alpha=EWM_ALPHA).mean()
+    last5 = grouped.rolling(ROLLING_WINDOW, min_periods=ROLLING_MIN_PERIODS).mean()
+
+    # groupby().rolling/ewm добавляют ключи в индекс — возвращаем исходный
+    n_keys = len(keys)
+    ewm = ewm.droplevel(list(range(n_keys)))
+    last5 = last5.droplevel(list(range(n_keys)))
+
+    return pd.DataFrame(
+        {
+            "xg_ewm": ewm,
+            "xg_last5": last5["xg"],
+            "shots_last5": last5["shots"],
+        }
+    ).reindex(long.index)
+
+
+def add_rolling_features(game, by_venue=False):
+    game = game.sort_values("game_date").reset_index(drop=True)
+
+    long = to_team_games(game)
+    stats = team_rolling_stats(long, by_venue=by_venue)
+
+    # pivot обратно в home_/away_ колонки
+    for col in stats.columns:
+        for side, is_home in (("home", 1), ("away", 0)):
+            mask = (long["is_home"] == is_home).to_numpy()
+            values = np.full(len(game), np.nan)
+            values[long.loc[mask, "row"].to_numpy()] = stats.loc[mask, col].to_numpy()
+            game[f"{side}_{col}"] = values
 
     # diffs
     game["xg_diff_last5"] = game["home_xg_last5"] - game["away_xg_last5"]
@@ -154,6 +165,19 @@ def add_rolling_features(game):
     return game
 
 
+# ======================
+# LOAD GAME AGGREGATES
+# ======================
+def load_game_aggregates():
+    if not OUTPUT_PATH.exists():
+        return pd.DataFrame(columns=AGG_COLUMNS)
+
+    game = pd.read_csv(OUTPUT_PATH, usecols=AGG_COLUMNS)
+    game["game_date"] = pd.to_datetime(game["game_date"])
+
+    return game
+
+
 # ======================
 # SAVE
 # ======================
@@ -170,9 +194,8 @@ def save_dataset(game):
 # ======================
 def main():
     df = load_data()
-    model = load_model()
 
-    df = add_xg(df, model)
+    df, _ = get_scorer().add_xg(df)
 
     game = aggregate_games(df)
     game = add_rolling_features(game)
@@ -182,5 +205,42 @@ def main():
     logger.info("Pipeline completed successfully")
 
 
+def build_xg_dataset():
+    build_xg_team_dataset.main()
+    main()
+
+
+def update_xg_features():
+    """
+    Инкрементально: достраиваем броски новых PBP, скорим только новые броски
+    и пересобираем агрегаты только их игр
+    """
+    if not OUTPUT_PATH.exists():
+        build_xg_dataset()
+        return
+
+    updated = build_xg_team_dataset.update_shots_dataset()
+
+    df = load_data()
+
+    df, new_games = get_scorer().add_xg(df, refresh_games=updated)
+
+    if not new_games:
+        logger.info("No new shots, xG features are up to date")
+        return
+
+    game_new = aggregate_games(df[df["game_id"].isin(new_games)])
+
+    game = load_game_aggregates()
+    game = game[~game["game_id"].isin(new_games)]
+    game = pd.concat([game, game_new[AGG_COLUMNS]], ignore_index=True).sort_values("game_id")
+
+    game = add_rolling_features(game)
+
+    save_dataset(game)
+
+    logger.info(f"Updated xG features for {len(new_games)} games")
+
+
 if __name__ == "__main__":
     main()
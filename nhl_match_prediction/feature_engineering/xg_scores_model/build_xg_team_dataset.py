@@ -18,18 +18,40 @@ from nhl_match_prediction.feature_engineering.xg_scores_model.xg_utils import ge
 
 logger = setup_logger("xg_dataset", LOG_PATH / "build_dataset.log")
 
+# PBP-файлы, из которых не получилось бросков (матч не сыгран, имя не id игры): имя -> mtime
+PBP_WITHOUT_SHOTS_PATH = XG_SHOTS_DATASET_PATH.with_name("pbp_without_shots.json")
+
 
 def load_json(path):
     with Path(path).open(encoding="utf-8") as f:
         return json.load(f)
 
 
-def process_game_pbp(game_data):
+RAW_EVENT_FIELDS = [
+    "game_seq",
+    "game_id",
+    "event_id",
+    "game_date",
+    "team_id",
+    "is_home",
+    "period",
+    "game_time",
+    "defending_side",
+    "x",
+    "y",
+    "shot_type",
+    "event_type",
+    "situation",
+]
+
+
+def extract_game_events(game_data, columns, game_seq):
+    """Дописывает сырые поля событий одной игры в плоские колонки, возвращает число событий"""
     home_id = game_data.get("homeTeam", {}).get("id")
     plays = game_data.get("plays", [])
     plays = sorted(plays, key=lambda x: (x["periodDescriptor"]["number"], x["timeInPeriod"]))
     if not plays:
-        return None
+        return 0
 
     # Собираем сторону защиты
     period_sides = {}
@@ -39,18 +61,11 @@ def process_game_pbp(game_data):
         if side and p and p not in period_sides:
             period_sides[p] = side
 
-    # valid_events = [
-    # 'shot', 'shot-on-goal', 'goal',
-    # 'missed-shot', 'blocked-shot', 'failed-shot-attempt']
-
-    rows = []
-
-    prev_event = None
+    game_id = game_data.get("id")
+    game_date = game_data.get("gameDate")
+    n_events = 0
 
     for play in plays:
-        # if play.get('typeDescKey') not in valid_events:
-        #     continue
-
         details = play.get("details", {})
         x, y = details.get("xCoord"), details.get("yCoord")
         team_id = details.get("eventOwnerTeamId")
@@ -59,99 +74,128 @@ def process_game_pbp(game_data):
             continue
 
         period = play["periodDescriptor"]["number"]
-        time_str = play["timeInPeriod"]
-        game_time = get_time_in_game(period, time_str)
+        shot_type = details.get("shotType")
+
+        columns["game_seq"].append(game_seq)
+        columns["game_id"].append(game_id)
+        columns["event_id"].append(play.get("eventId"))
+        columns["game_date"].append(game_date)
+        columns["team_id"].append(team_id)
+        columns["is_home"].append(team_id == home_id)
+        columns["period"].append(period)
+        columns["game_time"].append(get_time_in_game(period, play["timeInPeriod"]))
+        columns["defending_side"].append(period_sides.get(period))
+        columns["x"].append(x)
+        columns["y"].append(y)
+        columns["shot_type"].append(shot_type.lower() if shot_type else "unknown")
+        columns["event_type"].append(play["typeDescKey"])
+        # ситуация (manpower)
+        columns["situation"].append(play.get("situationCode"))
 
-        defending_side = period_sides.get(period)
-        if not defending_side:
-            defending_side = "left" if period % 2 != 0 else "right"
+        n_events += 1
 
-        is_home = team_id == home_id
+    return n_events
 
-        # нормализация координат
 
-        should_flip = defending_side == "right" if is_home else defending_side == "left"
+def _shift_within_game(values, same_game, fill=np.nan):
+    """Сдвиг на одно событие назад внутри игры (события одной игры идут подряд)"""
+    shifted = np.empty(len(values), dtype=np.result_type(values, np.float64))
+    if len(values):
+        shifted[0] = fill
+        shifted[1:] = values[:-1]
+    shifted[~same_game] = fill
+    return shifted
 
-        x_norm = -x if should_flip else x
-        y_norm = -y if should_flip else y
 
-        # геометрия
-        dist = np.sqrt((89 - x_norm) ** 2 + y_norm**2)
-        angle = np.arctan2(abs(y_norm), (89 - x_norm))
+def build_events_frame(columns):
+    raw = pd.DataFrame(columns, columns=RAW_EVENT_FIELDS)
 
-        # target
-        goal = 1 if play["typeDescKey"] == "goal" else 0
+    period = raw["period"].to_numpy()
+    is_home = raw["is_home"].to_numpy(dtype=bool)
 
-        # динамика
-        delta_t = None
-        delta_d = None
-        speed = None
-        delta_angle = None
-        prev_event_type = None
+    defending_side = raw["defending_side"].to_numpy(dtype=object)
+    missing_side = pd.isna(defending_side)
+    defending_side[missing_side] = np.where(period[missing_side] % 2 != 0, "left", "right")
 
-        if prev_event and game_time is not None:
-            if prev_event["time"] is not None:
-                delta_t = game_time - prev_event["time"]
-                if delta_t is not None and delta_t > 0:
-                    delta_d = np.sqrt(
-                        (x_norm - prev_event["x"]) ** 2 + (y_norm - prev_event["y"]) ** 2
-                    )
-                    speed = delta_d / delta_t
-                    delta_angle = abs(angle - prev_event["angle"])
+    # нормализация координат
+    should_flip = np.where(is_home, defending_side == "right", defending_side == "left")
 
-            prev_event_type = prev_event["type"]
+    # знак меняем до приведения типов, чтобы целые 0 не превращались в -0.0
+    x = np.array(columns["x"], dtype=object)
+    y = np.array(columns["y"], dtype=object)
+    x_norm = pd.Series(np.where(should_flip, -x, x)).infer_objects().to_numpy()
+    y_norm = pd.Series(np.where(should_flip, -y, y)).infer_objects().to_numpy()
 
-        # ситуация (manpower)
-        situation = play.get("situationCode")
+    # геометрия
+    dist = np.sqrt((89 - x_norm) ** 2 + y_norm**2)
+    angle = np.arctan2(np.abs(y_norm), (89 - x_norm))
 
-        shot_type = details.get("shotType")
+    # динамика: предыдущее событие той же игры
+    game_seq = raw["game_seq"].to_numpy()
+    same_game = np.zeros(len(raw), dtype=bool)
+    same_game[1:] = game_seq[1:] == game_seq[:-1]
+
+    game_time = raw["game_time"].to_numpy(dtype=np.float64)
+    prev_time = _shift_within_game(game_time, same_game)
+    prev_x = _shift_within_game(x_norm, same_game)
+    prev_y = _shift_within_game(y_norm, same_game)
+    prev_angle = _shift_within_game(angle, same_game)
+
+    has_prev = same_game & ~np.isnan(game_time)
+    timed = has_prev & ~np.isnan(prev_time)
+
+    delta_t = np.where(timed, game_time - prev_time, np.nan)
+    moving = timed & (np.nan_to_num(delta_t) > 0)
 
-        shot_type = shot_type.lower() if shot_type else "unknown"
-
-        rows.append(
-            {
-                "game_id": game_data.get("id"),
-                "game_date": game_data.get("gameDate"),
-                "team_id": team_id,
-                "is_home": int(is_home),
-                "period": period,
-                "game_time": game_time,
-                # geometry
-                "x": x_norm,
-                "y": y_norm,
-                "distance": dist,
-                "angle": angle,
-                # shot info
-                "shot_type": shot_type,
-                "event_type": play["typeDescKey"],
-                # context
-                "situation": situation,
-                # dynamics
-                "delta_t": delta_t,
-                "delta_d": delta_d,
-                "speed": speed,
-                "delta_angle": delta_angle,
-                "prev_event_type": prev_event_type,
-                # target
-                "goal": goal,
-            }
-        )
-
-        # обновляем prev_event
-        prev_event = {
+    delta_d = np.full(len(raw), np.nan)
+    delta_d[moving] = np.sqrt(
+        (x_norm[moving] - prev_x[moving]) ** 2 + (y_norm[moving] - prev_y[moving]) ** 2
+    )
+    speed = np.full(len(raw), np.nan)
+    speed[moving] = delta_d[moving] / delta_t[moving]
+    delta_angle = np.full(len(raw), np.nan)
+    delta_angle[moving] = np.abs(angle[moving] - prev_angle[moving])
+
+    event_type = raw["event_type"].to_numpy(dtype=object)
+    prev_event_type = np.full(len(raw), None, dtype=object)
+    prev_event_type[1:][has_prev[1:]] = event_type[:-1][has_prev[1:]]
+
+    return pd.DataFrame(
+        {
+            "game_id": raw["game_id"],
+            # eventId стабилен внутри игры и при повторной загрузке PBP
+            "event_id": raw["event_id"],
+            "game_date": raw["game_date"],
+            "team_id": raw["team_id"],
+            "is_home": is_home.astype(int),
+            "period": raw["period"],
+            "game_time": raw["game_time"],
+            # geometry
             "x": x_norm,
             "y": y_norm,
-            "time": game_time,
+            "distance": dist,
             "angle": angle,
-            "type": play["typeDescKey"],
+            # shot info
+            "shot_type": raw["shot_type"],
+            "event_type": raw["event_type"],
+            # context
+            "situation": raw["situation"],
+            # dynamics
+            "delta_t": delta_t,
+            "delta_d": delta_d,
+            "speed": speed,
+            "delta_angle": delta_angle,
+            "prev_event_type": prev_event_type,
+            # target
+            "goal": (event_type == "goal").astype(int),
         }
-
-    return pd.DataFrame(rows) if rows else None
+    )
 
 
-def build_dataset():
-    all_games = sorted(PBP_PATH.glob("*.json"))
-    dfs = []
+def build_dataset(game_paths=None):
+    all_games = sorted(PBP_PATH.glob("*.json")) if game_paths is None else game_paths
+    columns = {field: [] for field in RAW_EVENT_FIELDS}
+    n_games = 0
 
     for game_path in tqdm(all_games, desc="Processing games"):
         try:
@@ -160,17 +204,15 @@ def build_dataset():
             logger.warning(f"Failed to load {game_path}: {e}")
             continue
 
-        df_game = process_game_pbp(data)
+        if extract_game_events(data, columns, game_seq=n_games):
+            n_games += 1
 
-        if df_game is not None:
-            dfs.append(df_game)
-
-    if not dfs:
+    if not n_games:
         raise ValueError("No PBP data loaded")
 
-    logger.info(f"Total games processed: {len(dfs)}")
+    logger.info(f"Total games processed: {n_games}")
 
-    df_full = pd.concat(dfs, ignore_index=True)
+    df_full = build_events_frame(columns)
     df_full = df_full.sort_values(["game_id", "period", "game_time"]).reset_index(drop=True)
 
     logger.info(f"Shape of full PBP dataset events: {df_full.shape}")
@@ -197,7 +239,7 @@ def split_games(df):
     return train_games, test_games
 
 
-def add_features(df, train_games):
+def add_features(df, train_games, common=None):
     df = df.sort_values(["game_id", "period", "game_time"]).reset_index(drop=True)
 
     codes = df["situation"].astype(str).str.zfill(4)
@@ -234,10 +276,10 @@ def add_features(df, train_games):
         df["event_type"].isin(["shot", "shot-on-goal", "goal", "missed-shot"])
     ).astype(int)
 
-    top_k = 10
-    train_df = df[df["game_id"].isin(train_games)]
-
-    common = train_df["situation_compact"].value_counts().index[:top_k]
+    if common is None:
+        top_k = 10
+        train_df = df[df["game_id"].isin(train_games)]
+        common = train_df["situation_compact"].value_counts().index[:top_k]
 
     df["situation_compact"] = df["situation_compact"].where(
         df["situation_compact"].isin(common), "other"
@@ -275,5 +317,97 @@ def main():
     print("Saved datasets")
 
 
+def load_pbp_without_shots() -> dict[str, float]:
+    if not PBP_WITHOUT_SHOTS_PATH.exists():
+        return {}
+
+    return load_json(PBP_WITHOUT_SHOTS_PATH)
+
+
+def save_pbp_without_shots(paths, known_games, skipped: dict[str, float]):
+    """Запоминает файлы без бросков, чтобы не перечитывать их, пока они не перекачаны"""
+    skipped = {name: mtime for name, mtime in skipped.items() if (PBP_PATH / name).exists()}
+
+    for path in paths:
+        if not path.stem.isdigit() or int(path.stem) not in known_games:
+            skipped[path.name] = path.stat().st_mtime
+
+    tmp_path = PBP_WITHOUT_SHOTS_PATH.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(skipped), encoding="utf-8")
+    tmp_path.replace(PBP_WITHOUT_SHOTS_PATH)
+
+
+def pbp_files_to_update(known_games, since, skipped: dict[str, float]):
+    """
+    PBP-файлы игр, которых нет в датасете бросков или которые перекачаны после since.
+    Файлы из skipped пропускаются, пока их mtime не изменился.
+    """
+    paths = []
+
+    for path in sorted(PBP_PATH.glob("*.json")):
+        mtime = path.stat().st_mtime
+
+        if skipped.get(path.name) == mtime:
+            continue
+
+        if not path.stem.isdigit() or int(path.stem) not in known_games or mtime > since:
+            paths.append(path)
+
+    return paths
+
+
+def update_shots_dataset():
+    """
+    Инкрементально: пересобирает броски только новых и перекачанных игр
+    и заменяет ими строки этих игр в датасете бросков.
+    Возвращает множество пересобранных игр.
+    """
+    if not XG_SHOTS_DATASET_PATH.exists():
+        main()
+        return set(pd.read_csv(XG_SHOTS_DATASET_PATH, usecols=["game_id"])["game_id"])
+
+    shots = pd.read_csv(XG_SHOTS_DATASET_PATH)
+
+    if "event_id" not in shots.columns:
+        logger.info("Shots dataset has no event_id, rebuilding from scratch")
+        main()
+        return set(pd.read_csv(XG_SHOTS_DATASET_PATH, usecols=["game_id"])["game_id"])
+
+    skipped = load_pbp_without_shots()
+    paths = pbp_files_to_update(
+        set(shots["game_id"]), XG_SHOTS_DATASET_PATH.stat().st_mtime, skipped
+    )
+
+    if not paths:
+        logger.info("No new PBP files")
+        return set()
+
+    try:
+        df = build_dataset(paths)
+    except ValueError:
+        # PBP ещё не сыгранных матчей приходит без событий
+        logger.info(f"No events in {len(paths)} new PBP files")
+        save_pbp_without_shots(paths, set(), skipped)
+        return set()
+
+    # редкие ситуации сворачиваются в "other" по тому же списку, что и при полной сборке
+    common = set(shots["situation_compact"].unique()) - {"other"}
+    df = add_features(df, train_games=[], common=common)
+
+    df_new = df[df["event_type"].isin(VALID_EVENTS)]
+    updated = set(df["game_id"].unique())
+
+    shots = shots[~shots["game_id"].isin(updated)]
+    shots = pd.concat([shots, df_new[shots.columns]], ignore_index=True)
+    shots = shots.sort_values(["game_id", "period", "game_time"]).reset_index(drop=True)
+
+    shots.to_csv(XG_SHOTS_DATASET_PATH, index=False)
+    save_pbp_without_shots(paths, set(shots["game_id"]), skipped)
+
+    logger.info(f"Updated shots for {len(updated)} games from {len(paths)} PBP files")
+
+    return updated
+
+
 if __name__ == "__main__":
     main()
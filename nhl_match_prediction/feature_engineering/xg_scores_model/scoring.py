@@ -0,0 +1,141 @@
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from catboost import CatBoostClassifier, Pool
+
+from nhl_match_prediction.feature_engineering.xg_scores_model.config import (
+    LOG_PATH,
+    MODEL_FILE,
+    PROCESSED_PATH,
+)
+from nhl_match_prediction.feature_engineering.xg_scores_model.logger import setup_logger
+
+logger = setup_logger("xg_scoring", LOG_PATH / "scoring.log")
+
+
+# ключ — eventId из PBP: порядковый номер броска сдвигается, если игру перекачали
+XG_CACHE_PATH = PROCESSED_PATH / "xg_event_cache.csv"
+CACHE_KEY = ["game_id", "event_id"]
+BATCH_SIZE = 200_000
+
+
+def model_version(model_file: Path) -> str:
+    """Версия модели — хэш содержимого файла"""
+    digest = hashlib.md5(Path(model_file).read_bytes(), usedforsecurity=False)
+    return digest.hexdigest()[:12]
+
+
+class XGScorer:
+    """Модель xG, загруженная один раз, и кэш xG по броскам"""
+
+    def __init__(
+        self,
+        model_file: Path = MODEL_FILE,
+        cache_path: Path = XG_CACHE_PATH,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.model = CatBoostClassifier()
+        self.model.load_model(model_file)
+
+        self.version = model_version(model_file)
+        self.cache_path = Path(cache_path)
+        self.batch_size = batch_size
+
+        self.feature_names = self.model.feature_names_
+        self.cat_features = [self.feature_names[i] for i in self.model.get_cat_feature_indices()]
+
+        logger.info(f"Loaded xG model from {model_file} (version {self.version})")
+
+    # ======================
+    # PREDICT
+    # ======================
+    def prepare_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        x = df.reindex(columns=self.feature_names)
+
+        for col in self.feature_names:
+            if col in self.cat_features:
+                x[col] = x[col].fillna("unknown").astype(str)
+            else:
+                x[col] = x[col].fillna(0)
+
+        return x
+
+    def score(self, df: pd.DataFrame) -> np.ndarray:
+        x = self.prepare_features(df)
+        xg = np.empty(len(x), dtype=np.float64)
+
+        for start in range(0, len(x), self.batch_size):
+            batch = x.iloc[start : start + self.batch_size]
+            pool = Pool(batch, cat_features=self.cat_features)
+            xg[start : start + len(batch)] = self.model.predict(
+                pool, prediction_type="Probability", thread_count=-1
+            )[:, 1]
+
+        return xg
+
+    # ======================
+    # CACHE
+    # ======================
+    def read_cache(self) -> pd.DataFrame:
+        """Весь кэш: строки всех версий модели"""
+        if not self.cache_path.exists():
+            return pd.DataFrame(
+                {
+                    "game_id": pd.Series(dtype="int64"),
+                    "event_id": pd.Series(dtype="int64"),
+                    "model_version": pd.Series(dtype="str"),
+                    "xg": pd.Series(dtype="float64"),
+                }
+            )
+
+        # версия — hex-хэш: без dtype версии из одних цифр или вида 1e5 читаются как числа
+        return pd.read_csv(self.cache_path, dtype={"model_version": str})
+
+    def save_cache(self, cache: pd.DataFrame, scored: pd.DataFrame, refresh_games=()):
+        """
+        Переписывает кэш: новые значения заменяют старые по CACHE_KEY,
+        прежние строки перекачанных игр удаляются.
+        """
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        rows = scored[CACHE_KEY].assign(model_version=self.version, xg=scored["xg"].to_numpy())
+        cache = cache[~cache["game_id"].isin(refresh_games)]
+        cache = pd.concat([cache, rows], ignore_index=True).drop_duplicates(CACHE_KEY, keep="last")
+
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        cache.to_csv(tmp_path, index=False)
+        tmp_path.replace(self.cache_path)
+
+    def add_xg(self, df: pd.DataFrame, refresh_games=()) -> tuple[pd.DataFrame, set]:
+        """
+        Добавляет колонку xg. Считаются только броски, которых нет в кэше
+        для текущей версии модели, и все броски игр refresh_games
+        (их PBP перекачан, события могли исправить).
+
+        Возвращает датасет и множество игр, в которых появились новые броски.
+        """
+        stored = self.read_cache()
+        cache = stored[
+            (stored["model_version"] == self.version) & ~stored["game_id"].isin(refresh_games)
+        ]
+        cache = cache[[*CACHE_KEY, "xg"]].drop_duplicates(CACHE_KEY, keep="last")
+        df = df.drop(columns="xg", errors="ignore").merge(cache, on=CACHE_KEY, how="left")
+
+        missing = df["xg"].isna().to_numpy()
+        new_games = set(df.loc[missing, "game_id"].unique())
+
+        logger.info(f"xG cache hits: {(~missing).sum()}, shots to score: {missing.sum()}")
+
+        if missing.any():
+            df.loc[missing, "xg"] = self.score(df[missing])
+            self.save_cache(stored, df[missing], refresh_games)
+
+        return df, new_games
+
+
+@lru_cache(maxsize=1)
+def get_scorer() -> XGScorer:
+    return XGScorer()
@@ -1,4 +1,7 @@
+import argparse
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -24,6 +27,10 @@ from nhl_match_prediction.feature_engineering.xg_scores_model.xg_utils import (
 
 logger = setup_logger("xg_train", LOG_PATH / "train.log")
 
+STUDY_STORAGE = LOG_PATH / "optuna_xg.db"
+STUDY_NAME = "xg_catboost"
+REPORT_EVERY = 100
+
 
 # ======================
 # LOAD
@@ -126,21 +133,25 @@ def split_data(df, X, y):
 # ======================
 # OPTUNA
 # ======================
+def suggest_params(trial):
+    return {
+        "iterations": 2000,
+        "depth": trial.suggest_int("depth", 4, 6),
+        "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.08, log=True),
+        "l2_leaf_reg": trial.suggest_float("l2_leaf_reg", 5, 25),
+        "random_strength": trial.suggest_float("random_strength", 3, 10),
+        "loss_function": "Logloss",
+        "eval_metric": "AUC",
+        "random_state": RANDOM_STATE,
+        "verbose": False,
+        "allow_writing_files": False,
+        "auto_class_weights": "Balanced",
+    }
+
+
 def run_optuna(X_train, y_train, X_val, y_val, cat_features):
     def objective(trial):
-        params = {
-            "iterations": 2000,
-            "depth": trial.suggest_int("depth", 4, 6),
-            "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.08, log=True),
-            "l2_leaf_reg": trial.suggest_float("l2_leaf_reg", 5, 25),
-            "random_strength": trial.suggest_float("random_strength", 3, 10),
-            "loss_function": "Logloss",
-            "eval_metric": "AUC",
-            "random_state": RANDOM_STATE,
-            "verbose": False,
-            "allow_writing_files": False,
-            "auto_class_weights": "Balanced",
-        }
+        params = suggest_params(trial)
 
         logger.debug(f"Trial params: {params}")
 
@@ -173,6 +184,154 @@ def run_optuna(X_train, y_train, X_val, y_val, cat_features):
     return study.best_params, study
 
 
+# ======================
+# PARALLEL OPTUNA
+# ======================
+class PruningCallback:
+    """Отправляет AUC на валидации в Optuna и останавливает fit, если триал бесперспективен"""
+
+    def __init__(self, trial, report_every=REPORT_EVERY):
+        self.trial = trial
+        self.report_every = report_every
+        self.pruned = False
+
+    def after_iteration(self, info):
+        if info.iteration % self.report_every:
+            return True
+
+        auc = info.metrics["validation"]["AUC"][-1]
+        self.trial.report(auc, step=info.iteration)
+
+        if self.trial.should_prune():
+            self.pruned = True
+            return False
+
+        return True
+
+
+_worker_data = None
+
+
+def _init_worker(data, cat_features):
+    global _worker_data  # noqa: PLW0603
+    _worker_data = (data, cat_features)
+
+
+def _pruned_objective(trial, thread_count):
+    (X_train, y_train, X_val, y_val), cat_features = _worker_data
+
+    params = suggest_params(trial)
+    params["thread_count"] = thread_count
+
+    logger.debug(f"Trial params: {params}")
+
+    pruning = PruningCallback(trial)
+    model = CatBoostClassifier(**params)
+
+    model.fit(
+        X_train,
+        y_train,
+        eval_set=(X_val, y_val),
+        cat_features=cat_features,
+        early_stopping_rounds=200,
+        callbacks=[pruning],
+        verbose=False,
+    )
+
+    if pruning.pruned:
+        raise optuna.TrialPruned()
+
+    preds = model.predict_proba(X_val)[:, 1]
+
+    return roc_auc_score(y_val, preds)
+
+
+def _finished_trials(study):
+    states = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+    return len(study.get_trials(deepcopy=False, states=states))
+
+
+def load_study(storage, study_name, seed=RANDOM_STATE):
+    return optuna.create_study(
+        study_name=study_name,
+        storage=optuna.storages.RDBStorage(
+            f"sqlite:///{storage}", engine_kwargs={"connect_args": {"timeout": 60}}
+        ),
+        direction="maximize",
+        sampler=optuna.samplers.TPESampler(seed=seed, constant_liar=True),
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=REPORT_EVERY),
+        load_if_exists=True,
+    )
+
+
+def _optimize_worker(storage, study_name, n_trials, worker_id, thread_count):
+    # разный seed, иначе все воркеры предложат одни и те же параметры
+    study = load_study(storage, study_name, seed=RANDOM_STATE + worker_id)
+
+    if _finished_trials(study) >= n_trials:
+        return
+
+    study.optimize(
+        lambda trial: _pruned_objective(trial, thread_count),
+        callbacks=[
+            optuna.study.MaxTrialsCallback(
+                n_trials,
+                states=(optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED),
+            )
+        ],
+    )
+
+
+def run_optuna_parallel(  # noqa: PLR0913
+    data,
+    cat_features,
+    n_trials=50,
+    n_workers=4,
+    threads_per_trial=None,
+    storage=STUDY_STORAGE,
+    study_name=STUDY_NAME,
+):
+    """
+    Параллельный поиск: воркеры-процессы берут триалы из общего SQLite-хранилища.
+
+    Повторный запуск под тем же study_name продолжает прерванное исследование
+    до n_trials завершённых (или отсечённых) триалов.
+    """
+    threads_per_trial = threads_per_trial or max(1, (os.cpu_count() or 1) // n_workers)
+
+    study = load_study(storage, study_name)
+    done = _finished_trials(study)
+
+    logger.info(
+        f"Study '{study_name}': {done}/{n_trials} trials done, "
+        f"{n_workers} workers x {threads_per_trial} threads"
+    )
+
+    # незавершённые триалы прерванного запуска больше никто не досчитает
+    for trial in study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.RUNNING,)):
+        study.tell(trial.number, state=optuna.trial.TrialState.FAIL)
+
+    with ProcessPoolExecutor(
+        max_workers=n_workers, initializer=_init_worker, initargs=(data, cat_features)
+    ) as pool:
+        futures = [
+            pool.submit(_optimize_worker, storage, study_name, n_trials, i, threads_per_trial)
+            for i in range(n_workers)
+        ]
+        for future in futures:
+            future.result()
+
+    study = load_study(storage, study_name)
+
+    trials_df = study.trials_dataframe()
+    trials_df.to_csv(LOG_PATH / "optuna_trials.csv", index=False)
+
+    logger.info(f"Best AUC: {study.best_value}")
+    logger.info(f"Best params: {study.best_params}")
+
+    return study.best_params, study
+
+
 def train_final_model(data, cat_features, params):
     (X_train, y_train, X_val, y_val) = data
     model = CatBoostClassifier(
@@ -220,14 +379,24 @@ def save_model(model, metadata):
     fi.to_csv(LOG_PATH / f"feature_importance_{timestamp}.csv", index=False)
 
 
-def main():
+def main(n_workers=1, n_trials=50, threads_per_trial=None, study_name=STUDY_NAME):
     df = load_data()
 
     X, y, cat_features = prepare_features(df)
 
     X_train, y_train, X_val, y_val, X_test, y_test = split_data(df, X, y)
 
-    best_params, _ = run_optuna(X_train, y_train, X_val, y_val, cat_features)
+    if n_workers > 1:
+        best_params, _ = run_optuna_parallel(
+            (X_train, y_train, X_val, y_val),
+            cat_features,
+            n_trials=n_trials,
+            n_workers=n_workers,
+            threads_per_trial=threads_per_trial,
+            study_name=study_name,
+        )
+    else:
+        best_params, _ = run_optuna(X_train, y_train, X_val, y_val, cat_features)
 
     # train final
     X_full = pd.concat([X_train, X_val])
@@ -257,4 +426,16 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train xG model")
+    parser.add_argument("--workers", type=int, default=1, help="parallel Optuna workers")
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--threads-per-trial", type=int, default=None)
+    parser.add_argument("--study-name", default=STUDY_NAME)
+    args = parser.parse_args()
+
+    main(
+        n_workers=args.workers,
+        n_trials=args.trials,
+        threads_per_trial=args.threads_per_trial,
+        study_name=args.study_name,
+    )
@@ -0,0 +1,256 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import pairwise
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from omegaconf import OmegaConf
+from sklearn.base import clone
+from sklearn.ensemble import BaseEnsemble
+from sklearn.metrics import accuracy_score, brier_score_loss, log_loss, roc_auc_score
+from sklearn.pipeline import Pipeline
+from threadpoolctl import threadpool_limits
+
+from nhl_match_prediction.modeling.factory import get_model
+from nhl_match_prediction.modeling.models.logistic import load_dataset, prepare_data
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DATA_PATH = BASE_DIR / "data" / "processed" / "match_features.csv"
+MODEL_CONFIG_DIR = BASE_DIR / "configs" / "modeling" / "model"
+BACKTEST_DIR = BASE_DIR / "logs" / "backtest"
+
+THRESHOLD = 0.5
+MIN_TRAIN_GAMES = 1000
+
+# W — переобучение по понедельникам, M — в первый день каждого месяца
+FREQUENCIES = {"W": "W-MON", "M": "MS"}
+
+# сколько обработанных префиксов держит один воркер
+PREPROCESS_CACHE_SIZE = 32
+
+logger = logging.getLogger(__name__)
+
+
+# ======================
+# FOLDS
+# ======================
+def walk_forward_folds(
+    dates: pd.Series, freq: str = "M", min_train: int = MIN_TRAIN_GAMES
+) -> list[tuple[int, int]]:
+    """
+    Расширяющееся окно по отсортированным датам матчей.
+
+    Фолд (train_end, test_end): обучение на строках [0, train_end),
+    прогноз на [train_end, test_end) — следующая неделя или месяц.
+    Периоды без матчей (межсезонье) пропускаются.
+    """
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+
+    if len(dates) <= min_train:
+        return []
+
+    cutoffs = pd.date_range(dates[min_train], dates[-1], freq=FREQUENCIES[freq])
+    bounds = np.unique(np.r_[dates.searchsorted(cutoffs), len(dates)])
+
+    return [(int(a), int(b)) for a, b in pairwise(bounds) if a >= min_train]
+
+
+# ======================
+# WORKER
+# ======================
+_worker_data = None
+_preprocess_cache: dict[tuple, tuple[np.ndarray, np.ndarray]] = {}
+
+
+def init_worker(x, y, threads):
+    global _worker_data  # noqa: PLW0603
+    _worker_data = (x, y)
+    _preprocess_cache.clear()
+
+    # numpy/BLAS и OpenMP внутри воркера не берут больше потоков, чем ему выделено
+    threadpool_limits(threads)
+
+
+def transform_fold(pipeline: Pipeline, train_end: int, test_end: int):
+    """
+    Прогоняет фолд через шаги препроцессинга пайплайна (всё, кроме модели).
+
+    Обученный шаг зависит только от префикса [0, train_end) и своих параметров,
+    поэтому результат каждого шага кэшируется: если imputer одинаковый
+    (логистическая регрессия и лес, кандидаты поиска), он обучается один раз.
+    """
+    x, _ = _worker_data
+    x_train, x_test = x[:train_end], x[train_end:test_end]
+    key: tuple = (train_end, test_end)
+
+    for _, step in pipeline.steps[:-1]:
+        key += (repr(step),)
+        cached = _preprocess_cache.get(key)
+
+        if cached is None:
+            fitted = clone(step).fit(x_train)
+            cached = (fitted.transform(x_train), fitted.transform(x_test))
+
+            if len(_preprocess_cache) >= PREPROCESS_CACHE_SIZE:
+                _preprocess_cache.pop(next(iter(_preprocess_cache)))
+            _preprocess_cache[key] = cached
+
+        x_train, x_test = cached
+
+    return x_train, x_test
+
+
+def fit_predict(pipeline: Pipeline, train_end: int, test_end: int, threads: int = 1) -> np.ndarray:
+    _, y = _worker_data
+    x_train, x_test = transform_fold(pipeline, train_end, test_end)
+
+    estimator = clone(pipeline.steps[-1][1])
+    if isinstance(estimator, BaseEnsemble):
+        # деревья строятся в потоках, выделенных воркеру
+        estimator.set_params(n_jobs=threads)
+
+    estimator.fit(x_train, y[:train_end])
+
+    return estimator.predict_proba(x_test)[:, 1]
+
+
+def score_fold(pipeline: Pipeline, train_end: int, test_end: int, threads: int = 1) -> dict:
+    _, y = _worker_data
+    return score(y[train_end:test_end], fit_predict(pipeline, train_end, test_end, threads))
+
+
+def _run_fold(train_end: int, test_end: int, models: dict, threads: int) -> dict:
+    return {
+        name: fit_predict(get_model(name, params), train_end, test_end, threads)
+        for name, params in models.items()
+    }
+
+
+# ======================
+# METRICS
+# ======================
+def score(y_true, proba) -> dict[str, float]:
+    y_true = np.asarray(y_true)
+
+    return {
+        "accuracy": accuracy_score(y_true, proba >= THRESHOLD),
+        "log_loss": log_loss(y_true, proba, labels=[0, 1]),
+        "brier_score": brier_score_loss(y_true, proba),
+        # в коротком окне могут оказаться победы только одной стороны
+        "roc_auc": roc_auc_score(y_true, proba) if len(np.unique(y_true)) > 1 else np.nan,
+    }
+
+
+# ======================
+# BACKTEST
+# ======================
+def backtest(
+    df: pd.DataFrame,
+    models: dict[str, dict],
+    freq: str = "M",
+    min_train: int = MIN_TRAIN_GAMES,
+    n_workers: int = 1,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Walk-forward бэктест: для каждого фолда модели models (имя -> параметры)
+    обучаются на всех матчах до начала окна и прогнозируют матчи окна.
+    Фолды считаются параллельно в n_workers процессах, ядра делятся между ними.
+
+    Возвращает метрики по фолдам и сводные метрики по всем прогнозам каждой модели.
+    """
+    df = df.sort_values("game_date", kind="stable").reset_index(drop=True)
+    x, y = prepare_data(df)
+    x = x.to_numpy(dtype=float)
+    y = y.to_numpy(dtype=int)
+
+    folds = walk_forward_folds(df["game_date"], freq, min_train)
+    threads = max(1, (os.cpu_count() or 1) // n_workers)
+
+    logger.info(f"{len(folds)} folds, {n_workers} workers x {threads} threads")
+
+    with ProcessPoolExecutor(
+        max_workers=n_workers, initializer=init_worker, initargs=(x, y, threads)
+    ) as pool:
+        results = list(
+            pool.map(
+                _run_fold,
+                *zip(*folds, strict=True),
+                [models] * len(folds),
+                [threads] * len(folds),
+            )
+        )
+
+    dates = pd.to_datetime(df["game_date"])
+    rows = []
+    oof = {name: [] for name in models}
+
+    for (train_end, test_end), probas in zip(folds, results, strict=True):
+        y_test = y[train_end:test_end]
+
+        for name, proba in probas.items():
+            oof[name].append(proba)
+            rows.append(
+                {
+                    "model": name,
+                    "window_start": dates.iloc[train_end],
+                    "window_end": dates.iloc[test_end - 1],
+                    "n_train": train_end,
+                    "n_test": test_end - train_end,
+                    **score(y_test, proba),
+                }
+            )
+
+    folds_df = pd.DataFrame(rows)
+
+    if not folds:
+        return folds_df, pd.DataFrame()
+
+    y_oof = y[folds[0][0] : folds[-1][1]]
+    summary = pd.DataFrame(
+        [{"model": name, **score(y_oof, np.concatenate(p))} for name, p in oof.items()]
+    )
+
+    return folds_df, summary
+
+
+def load_params(model_name: str) -> dict:
+    """Параметры модели из configs/modeling/model/<name>.yaml"""
+    cfg = OmegaConf.load(MODEL_CONFIG_DIR / f"{model_name}.yaml")
+    return OmegaConf.to_container(cfg.params)
+
+
+def main(model_names, freq="M", min_train=MIN_TRAIN_GAMES, n_workers=1, data_path=DATA_PATH):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    df = load_dataset(data_path)
+    models = {name: load_params(name) for name in model_names}
+
+    folds_df, summary = backtest(df, models, freq, min_train, n_workers)
+
+    BACKTEST_DIR.mkdir(parents=True, exist_ok=True)
+    folds_df.to_csv(BACKTEST_DIR / f"folds_{freq}.csv", index=False)
+    summary.to_csv(BACKTEST_DIR / f"summary_{freq}.csv", index=False)
+
+    logger.info(f"Backtest summary:\n{summary.to_string(index=False)}")
+    logger.info(f"Saved to {BACKTEST_DIR}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of match models")
+    parser.add_argument("--models", nargs="+", default=["logistic", "random_forest"])
+    parser.add_argument("--freq", choices=sorted(FREQUENCIES), default="M")
+    parser.add_argument("--min-train", type=int, default=MIN_TRAIN_GAMES)
+    parser.add_argument("--workers", type=int, default=1, help="parallel fold workers")
+    parser.add_argument("--data", type=Path, default=DATA_PATH)
+    args = parser.parse_args()
+
+    main(
+        args.models,
+        freq=args.freq,
+        min_train=args.min_train,
+        n_workers=args.workers,
+        data_path=args.data,
+    )
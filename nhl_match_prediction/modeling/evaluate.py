@@ -7,13 +7,22 @@ from sklearn.metrics import (
     log_loss,
     roc_auc_score,
 )
-from sqlalchemy import create_engine
+
+from nhl_match_prediction.db import reader, writer
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
 
 THRESHOLD = 0.5
 
+EVALUATE_QUERY = """
+    SELECT pr.*, home_win
+    FROM predictions pr
+    LEFT JOIN match_features m
+        on pr.game_id = m.game_id
+    WHERE home_win IS NOT NULL
+"""
+
 
 def evaluate_model(y_true, proba):
     pred = (proba >= THRESHOLD).astype(int)
@@ -27,18 +36,8 @@ def evaluate_model(y_true, proba):
 
 
 def main():
-    engine = create_engine(f"sqlite:///{DB_PATH}")
-
-    df = pd.read_sql(
-        """
-        SELECT pr.*, home_win
-        FROM predictions pr
-        LEFT JOIN match_features m
-            on pr.game_id = m.game_id
-        WHERE home_win IS NOT NULL
-    """,
-        engine,
-    )
+    with reader(DB_PATH) as con:
+        df = pd.read_sql(EVALUATE_QUERY, con)
 
     df["game_date"] = pd.to_datetime(df["game_date"]).dt.date
 
@@ -60,7 +59,8 @@ def main():
 
     metrics_df = pd.DataFrame(all_metrics)
 
-    metrics_df.to_sql("metrics", engine, if_exists="replace", index=False)
+    with writer(DB_PATH) as con:
+        metrics_df.to_sql("metrics", con, if_exists="replace", index=False)
 
     print("Saved to DB → metrics table")
 
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+
+class LinearExplainer:
+    """
+    SHAP-значения для линейной модели или Pipeline(препроцессинг -> линейная модель).
+
+    Для линейной модели interventional SHAP считается в закрытой форме:
+    coef * (x - mean(background)), где x и background уже прошли препроцессинг
+    пайплайна (imputer -> scaler). Даёт те же числа, что shap.LinearExplainer
+    на тех же преобразованных данных, но без shap и одной операцией над матрицей.
+    """
+
+    def __init__(self, model, background: pd.DataFrame):
+        if isinstance(model, Pipeline):
+            self.preprocess = model[:-1] if len(model) > 1 else None
+            estimator = model[-1]
+        else:
+            self.preprocess = None
+            estimator = model
+
+        coef = np.atleast_2d(np.asarray(estimator.coef_, dtype=float))
+        if coef.shape[0] != 1:
+            raise ValueError("Only single-output linear models are supported")
+
+        self.coef = coef[0]
+        self.intercept = float(np.ravel(estimator.intercept_)[0])
+
+        self.mean = np.mean(self.transform(background), 0)
+        self.expected_value = float(self.coef @ self.mean + self.intercept)
+
+    def transform(self, x) -> np.ndarray:
+        if self.preprocess is not None:
+            x = self.preprocess.transform(x)
+
+        return np.asarray(x, dtype=float)
+
+    def shap_values(self, x) -> np.ndarray:
+        return (self.transform(x) - self.mean) * self.coef
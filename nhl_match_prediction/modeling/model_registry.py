@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from nhl_match_prediction.db import DB_PATH, writer
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", BASE_DIR / "models"))
+
+MODEL_FILE = "model.joblib"
+META_FILE = "meta.json"
+CURRENT_FILE = "current"
+
+# сколько загруженных моделей держит один процесс
+MODEL_CACHE_SIZE = 4
+
+# модели, которые раньше лежали в logs/<name>/model2.joblib
+LEGACY_MODELS = {
+    "logistic": BASE_DIR / "logs" / "logistic" / "model2.joblib",
+    "random_forest": BASE_DIR / "logs" / "random_forest" / "model2.joblib",
+}
+
+
+# продвинутые версии дублируются в БД: по ним представление predictions выбирает прогнозы
+PROMOTED_TABLE = "promoted_models"
+CREATE_PROMOTED = f"""
+    CREATE TABLE IF NOT EXISTS {PROMOTED_TABLE} (
+        model_name TEXT PRIMARY KEY,
+        model_version TEXT NOT NULL,
+        promoted_at TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+"""
+
+
+class ModelNotRegisteredError(LookupError):
+    pass
+
+
+def data_hash(df: pd.DataFrame) -> str:
+    """Хэш обучающих данных: одинаковые данные дают одинаковый хэш"""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(",".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+
+def model_dir(name: str, version: str) -> Path:
+    return REGISTRY_DIR / name / version
+
+
+def current_version(name: str) -> str:
+    pointer = REGISTRY_DIR / name / CURRENT_FILE
+
+    if not pointer.exists() and name in LEGACY_MODELS:
+        # первый запуск после перехода на реестр: модели из logs/ регистрируются сами
+        import_legacy_models()
+
+    try:
+        return pointer.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        raise ModelNotRegisteredError(f"No current version of model {name!r}") from None
+
+
+def list_versions(name: str) -> list[str]:
+    if not (REGISTRY_DIR / name).exists():
+        return []
+
+    return sorted(
+        p.name
+        for p in (REGISTRY_DIR / name).iterdir()
+        if not p.name.startswith(".") and (p / META_FILE).exists()
+    )
+
+
+def promote(name: str, version: str) -> str:
+    """
+    Делает версию текущей; указатель переключается атомарно.
+    Версия записывается и в PROMOTED_TABLE, откат сразу виден в predictions.
+    """
+    if not (model_dir(name, version) / META_FILE).exists():
+        raise ModelNotRegisteredError(f"Model {name!r} has no version {version!r}")
+
+    pointer = REGISTRY_DIR / name / CURRENT_FILE
+    tmp_path = pointer.with_name(f".{CURRENT_FILE}.{os.urandom(3).hex()}.tmp")
+    tmp_path.write_text(version, encoding="utf-8")
+    tmp_path.replace(pointer)
+
+    # без БД (она ещё не скачана) версию запишет predict при первом запуске
+    if DB_PATH.exists():
+        with writer(DB_PATH) as con:
+            record_promoted(con, name, version)
+
+    return version
+
+
+def record_promoted(con: sqlite3.Connection, name: str, version: str):
+    con.execute(CREATE_PROMOTED)
+    con.execute(
+        f"INSERT OR REPLACE INTO {PROMOTED_TABLE} (model_name, model_version) VALUES (?, ?)",
+        (name, version),
+    )
+
+
+def register_model(  # noqa: PLR0913
+    name: str,
+    model,
+    features: list[str],
+    metrics: dict | None = None,
+    data_hash: str | None = None,
+    params: dict | None = None,
+    version: str | None = None,
+) -> str:
+    """
+    Сохраняет модель и её метаданные в REGISTRY_DIR/<name>/<version>/.
+
+    Каталог собирается под временным именем и переименовывается, поэтому
+    читатели никогда не видят наполовину записанную версию.
+    Если такая version уже есть, переименование падает: OSError.
+    Возвращает версию; текущей она становится только после promote().
+    """
+    created_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    version = version or f"{time.strftime('%Y%m%d%H%M%S')}-{os.urandom(3).hex()}"
+
+    path = model_dir(name, version)
+    # временное имя уникально для процесса, даже если version задана явно
+    tmp_path = path.with_name(f".{version}.{os.urandom(3).hex()}.tmp")
+    tmp_path.mkdir(parents=True)
+
+    try:
+        # без сжатия: только так joblib может отдать массивы через mmap
+        joblib.dump(model, tmp_path / MODEL_FILE)
+
+        meta = {
+            "name": name,
+            "version": version,
+            "created_at": created_at,
+            "features": list(features),
+            "metrics": {k: float(v) for k, v in (metrics or {}).items()},
+            "data_hash": data_hash,
+            "params": params,
+        }
+        (tmp_path / META_FILE).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+        tmp_path.rename(path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    return version
+
+
+def get_metadata(name: str, version: str | None = None) -> dict:
+    version = version or current_version(name)
+    meta_path = model_dir(name, version) / META_FILE
+
+    if not meta_path.exists():
+        raise ModelNotRegisteredError(f"Model {name!r} has no version {version!r}")
+
+    return json.loads(meta_path.read_text(encoding="utf-8"))
+
+
+@lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _load(name: str, version: str):
+    path = model_dir(name, version) / MODEL_FILE
+
+    if not path.exists():
+        raise ModelNotRegisteredError(f"Model {name!r} has no version {version!r}")
+
+    # большие numpy-массивы (деревья леса, коэффициенты) читаются через mmap
+    # и делятся между процессами через page cache
+    return joblib.load(path, mmap_mode="r")
+
+
+def load_model(name: str, version: str | None = None):
+    """
+    Модель из реестра (по умолчанию текущая версия).
+    Версии неизменяемы, поэтому загруженная модель кэшируется в процессе.
+    """
+    return _load(name, version or current_version(name))
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(Path(path).read_bytes())
+
+    return digest.hexdigest()
+
+
+def import_legacy_models() -> dict[str, str]:
+    """
+    Регистрирует модели из logs/, если в реестре ещё нет версий этого имени.
+
+    Версия — хэш файла модели, поэтому процессы, которые стартовали
+    одновременно (воркеры API, Celery, бот), регистрируют одну и ту же версию
+    вместо своей в каждом.
+    """
+    imported = {}
+
+    for name, path in LEGACY_MODELS.items():
+        if not path.exists() or list_versions(name):
+            continue
+
+        version = f"legacy-{file_hash(path)}"
+
+        if not (model_dir(name, version) / META_FILE).exists():
+            model = joblib.load(path)
+            features = list(getattr(model, "feature_names_in_", []))
+
+            try:
+                register_model(name, model, features, version=version)
+            except OSError:
+                # ту же версию в это же время зарегистрировал другой процесс
+                if not (model_dir(name, version) / META_FILE).exists():
+                    raise
+
+        imported[name] = promote(name, version)
+
+    return imported
+
+
+if __name__ == "__main__":
+    for name, version in import_legacy_models().items():
+        print(f"✅ {name}: registered version {version}")
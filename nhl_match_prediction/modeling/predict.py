@@ -1,66 +1,191 @@
 import logging
+import sqlite3
+from collections.abc import Iterator
 from pathlib import Path
 
 import hydra
-import joblib
 import pandas as pd
 from omegaconf import DictConfig
-from sqlalchemy import create_engine
 
+from nhl_match_prediction.db import reader, writer
+from nhl_match_prediction.modeling.model_registry import (
+    CREATE_PROMOTED,
+    PROMOTED_TABLE,
+    current_version,
+    load_model,
+    record_promoted,
+)
 from nhl_match_prediction.modeling.models.logistic import prepare_data
+from nhl_match_prediction.schema import create_indexes
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
 
+PREDICT_FROM = "2026-01-01"
+CHUNK_SIZE = 5000
+
+MODELS = ["logistic", "random_forest"]
+
+HISTORY_TABLE = "prediction_history"
+META_COLS = ["game_id", "game_date", "home_team_abbr", "away_team_abbr"]
+
+# прогнозы не перезаписываются: каждая версия модели добавляет свои строки
+CREATE_HISTORY = f"""
+    CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+        game_id INTEGER NOT NULL,
+        model_name TEXT NOT NULL,
+        model_version TEXT NOT NULL,
+        game_date TEXT,
+        home_team_abbr TEXT,
+        away_team_abbr TEXT,
+        proba REAL,
+        created_at TEXT NOT NULL DEFAULT (datetime('now')),
+        PRIMARY KEY (game_id, model_name, model_version)
+    )
+"""
+
+# прежний широкий формат predictions для отчётов: прогнозы продвинутых версий моделей.
+# Каждая пара (модель, версия) в PROMOTED_TABLE — одна строка на матч, окно не нужно
+CREATE_PREDICTIONS_VIEW = f"""
+    CREATE VIEW IF NOT EXISTS predictions AS
+    SELECT
+        h.game_id,
+        MAX(h.game_date) AS game_date,
+        MAX(h.home_team_abbr) AS home_team_abbr,
+        MAX(h.away_team_abbr) AS away_team_abbr,
+        MAX(CASE WHEN h.model_name = 'logistic' THEN h.proba END) AS logistic_proba,
+        MAX(CASE WHEN h.model_name = 'random_forest' THEN h.proba END) AS random_forest_proba,
+        AVG(h.proba) AS avg_proba
+    FROM {PROMOTED_TABLE} pm
+    JOIN {HISTORY_TABLE} h
+        ON h.model_name = pm.model_name
+        AND h.model_version = pm.model_version
+    GROUP BY h.game_id
+"""
+
+MISSING_MATCHES_QUERY = f"""
+    SELECT m.*
+    FROM match_features m
+    LEFT JOIN {HISTORY_TABLE} h
+        ON h.game_id = m.game_id
+        AND h.model_name = ?
+        AND h.model_version = ?
+    WHERE m.game_date >= ?
+    AND h.game_id IS NULL
+"""
+
+
+def ensure_prediction_tables(con: sqlite3.Connection):
+    """
+    Создаёт историю прогнозов, таблицу продвинутых версий и представление predictions.
+    Старая таблица predictions переносится в историю под версией "legacy".
+    """
+    con.execute(CREATE_HISTORY)
+
+    legacy = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'predictions'"
+    ).fetchone()
+
+    if legacy:
+        for model_name in MODELS:
+            con.execute(
+                f"""
+                INSERT OR IGNORE INTO {HISTORY_TABLE}
+                    (game_id, model_name, model_version, game_date,
+                     home_team_abbr, away_team_abbr, proba)
+                SELECT
+                    game_id, ?, 'legacy', game_date,
+                    home_team_abbr, away_team_abbr, {model_name}_proba
+                FROM predictions
+                """,
+                (model_name,),
+            )
+        con.execute("DROP TABLE predictions")
+
+    con.execute(CREATE_PROMOTED)
+
+    # представление прежнего вида (последний прогноз любой версии) и индекс для него удаляются
+    con.execute("DROP VIEW IF EXISTS predictions")
+    con.execute("DROP INDEX IF EXISTS idx_prediction_history_latest")
+    con.execute(CREATE_PREDICTIONS_VIEW)
+    create_indexes(con, [HISTORY_TABLE, PROMOTED_TABLE])
+
+
+def load_missing_matches(
+    model_name: str, version: str, chunksize: int = CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """Матчи без прогноза этой версии модели, порциями по chunksize строк"""
+    with reader(DB_PATH) as con:
+        yield from pd.read_sql(
+            MISSING_MATCHES_QUERY,
+            con,
+            params=(model_name, version, PREDICT_FROM),
+            chunksize=chunksize,
+        )
+
+
+def save_predictions(model_name: str, version: str, meta: pd.DataFrame, proba) -> int:
+    rows = [
+        (game_id, model_name, version, game_date, home, away, float(p))
+        for (game_id, game_date, home, away), p in zip(
+            meta.itertuples(index=False, name=None), proba, strict=True
+        )
+    ]
+
+    with writer(DB_PATH) as con:
+        con.executemany(
+            f"""
+            INSERT OR IGNORE INTO {HISTORY_TABLE}
+                (game_id, model_name, model_version, game_date,
+                 home_team_abbr, away_team_abbr, proba)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+
+    return len(rows)
+
+
+def predict_model(model_name: str, chunksize: int = CHUNK_SIZE) -> int:
+    """
+    Досчитывает прогнозы текущей версии модели из реестра для новых матчей.
+    Возвращает число новых строк.
+    """
+    version = current_version(model_name)
+    saved = 0
 
-def load_upcoming_matches() -> pd.DataFrame:
-    engine = create_engine(f"sqlite:///{DB_PATH}")
+    # версию могли продвинуть до перехода на PROMOTED_TABLE
+    with writer(DB_PATH) as con:
+        record_promoted(con, model_name, version)
 
-    query = """
-        SELECT *
-        FROM match_features
-        WHERE game_date >= "2026-01-01"
-    """
+    for chunk in load_missing_matches(model_name, version, chunksize):
+        if chunk.empty:
+            continue
 
-    return pd.read_sql(query, engine)
+        model = load_model(model_name, version)
+
+        x, _ = prepare_data(chunk)
+        proba = model.predict_proba(x)[:, 1]
+
+        saved += save_predictions(model_name, version, chunk[META_COLS], proba)
+
+    return saved
 
 
 @hydra.main(version_base=None, config_path="../../configs/modeling", config_name="config")
 def main(cfg: DictConfig):
-    root = Path(hydra.utils.get_original_cwd())
-
     logger = logging.getLogger("predict_logger")
     logger.setLevel(logging.INFO)
 
     logger.info("=== Prediction step ===")
 
-    df = load_upcoming_matches()
-
-    meta_cols = ["game_id", "game_date", "home_team_abbr", "away_team_abbr"]
-    meta = df[meta_cols]
-
-    x, _ = prepare_data(df)
-
-    models = {"logistic": "model2.joblib", "random_forest": "model2.joblib"}
-
-    results = meta.copy()
-
-    for model_name, model_filename in models.items():
-        model_file = root / "logs" / model_name / model_filename
-
-        model = joblib.load(model_file)
-
-        proba = model.predict_proba(x)[:, 1]
-
-        results[f"{model_name}_proba"] = proba
-
-    results["avg_proba"] = results[[f"{model_name}_proba" for model_name in models]].mean(axis=1)
-
-    engine = create_engine(f"sqlite:///{DB_PATH}")
+    with writer(DB_PATH) as con:
+        ensure_prediction_tables(con)
 
-    results.to_sql("predictions", engine, if_exists="replace", index=False)
+    for model_name in MODELS:
+        saved = predict_model(model_name)
 
-    logger.info("Predictions saved to DB")
+        logger.info(f"{model_name}: {saved} new predictions saved to DB")
 
     logger.info("=== Prediction step done ===")
 
@@ -4,10 +4,10 @@ import logging
 from pathlib import Path
 
 import hydra
-import joblib
 from omegaconf import DictConfig
 
 from nhl_match_prediction.modeling.factory import get_model
+from nhl_match_prediction.modeling.model_registry import data_hash, promote, register_model
 from nhl_match_prediction.modeling.models.logistic import (
     evaluate_model,
     load_dataset,
@@ -61,9 +61,15 @@ def main(cfg: DictConfig):
     for metric_name, metric_value in metrics.items():
         logger.info(f"{metric_name}: {metric_value:.4f}")
 
-    model_file = log_dir / "model2.joblib"
-    joblib.dump(model, model_file)
-    logger.info(f"Model saved to {model_file.resolve()}")
+    version = register_model(
+        cfg.model.name,
+        model,
+        features=list(x_train.columns),
+        metrics=metrics,
+        data_hash=data_hash(df),
+    )
+    promote(cfg.model.name, version)
+    logger.info(f"Model registered: {cfg.model.name} version {version}")
 
     logger.info("=== Training step done ===")
 
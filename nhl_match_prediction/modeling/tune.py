@@ -0,0 +1,212 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import TimeSeriesSplit
+
+from nhl_match_prediction.modeling.backtest import (
+    DATA_PATH,
+    init_worker,
+    load_params,
+    score_fold,
+)
+from nhl_match_prediction.modeling.factory import get_model
+from nhl_match_prediction.modeling.model_registry import data_hash, promote, register_model
+from nhl_match_prediction.modeling.models.logistic import load_dataset, prepare_data
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+TUNING_DIR = BASE_DIR / "logs" / "tuning"
+
+N_SPLITS = 5
+RANDOM_STATE = 42
+
+# кандидаты по каждому параметру; поверх них — остальные параметры из configs/modeling/model
+SEARCH_SPACES = {
+    "logistic": {
+        "C": [0.01, 0.03, 0.1, 0.2, 0.5, 1.0, 3.0],
+        "class_weight": [None, "balanced"],
+    },
+    "random_forest": {
+        "n_estimators": [300, 500, 800],
+        "max_depth": [6, 8, 10, 14, None],
+        "min_samples_leaf": [1, 2, 5, 10],
+        "max_features": ["sqrt", "log2", 0.3],
+    },
+}
+
+logger = logging.getLogger(__name__)
+
+
+# ======================
+# CV
+# ======================
+def time_series_folds(n_rows: int, n_splits: int = N_SPLITS) -> list[tuple[int, int]]:
+    """Фолды TimeSeriesSplit как (train_end, test_end) по строкам, отсортированным по дате"""
+    return [
+        (len(train), int(test[-1]) + 1)
+        for train, test in TimeSeriesSplit(n_splits=n_splits).split(np.arange(n_rows))
+    ]
+
+
+def _evaluate(model_name: str, params: dict, folds: list, threads: int) -> dict[str, float]:
+    """
+    Средние метрики кандидата по фолдам. Считается в воркере: препроцессинг
+    фолдов кэшируется там же и переиспользуется следующими кандидатами.
+    """
+    pipeline = get_model(model_name, params)
+    metrics = [score_fold(pipeline, train_end, test_end, threads) for train_end, test_end in folds]
+
+    return pd.DataFrame(metrics).mean().to_dict()
+
+
+# ======================
+# SEARCH
+# ======================
+def grid_candidates(space: dict) -> list[dict]:
+    return [dict(zip(space, values, strict=True)) for values in product(*space.values())]
+
+
+def run_grid(  # noqa: PLR0913
+    pool, model_name, base_params, space, folds, threads
+) -> list[tuple[dict, dict]]:
+    candidates = grid_candidates(space)
+    logger.info(f"Grid search: {len(candidates)} candidates")
+
+    futures = [
+        pool.submit(_evaluate, model_name, {**base_params, **c}, folds, threads) for c in candidates
+    ]
+
+    return [(c, f.result()) for c, f in zip(candidates, futures, strict=True)]
+
+
+def run_optuna(  # noqa: PLR0913
+    pool, model_name, base_params, space, folds, threads, n_trials, n_workers
+) -> list[tuple[dict, dict]]:
+    """TPE через ask/tell: за раз в пул уходит по одному кандидату на воркер"""
+    # optuna нет в зависимостях проекта: нужна только для --search optuna
+    import optuna  # noqa: PLC0415
+
+    study = optuna.create_study(
+        direction="minimize",
+        sampler=optuna.samplers.TPESampler(seed=RANDOM_STATE, constant_liar=True),
+    )
+    results = []
+
+    while len(results) < n_trials:
+        trials = [study.ask() for _ in range(min(n_workers, n_trials - len(results)))]
+        candidates = [
+            {name: trial.suggest_categorical(name, values) for name, values in space.items()}
+            for trial in trials
+        ]
+        futures = [
+            pool.submit(_evaluate, model_name, {**base_params, **c}, folds, threads)
+            for c in candidates
+        ]
+
+        for trial, candidate, future in zip(trials, candidates, futures, strict=True):
+            metrics = future.result()
+            study.tell(trial, metrics["log_loss"])
+            results.append((candidate, metrics))
+
+        logger.info(
+            f"Trials done: {len(results)}/{n_trials}, best log loss: {study.best_value:.5f}"
+        )
+
+    return results
+
+
+def tune(  # noqa: PLR0913
+    df: pd.DataFrame,
+    model_name: str,
+    search: str = "grid",
+    n_trials: int = 30,
+    n_splits: int = N_SPLITS,
+    n_workers: int = 1,
+) -> tuple[dict, dict, pd.DataFrame]:
+    """
+    Подбор параметров model_name на time-series CV (лучший — по среднему log loss).
+
+    Кандидаты считаются в n_workers процессах; ядра делятся между ними,
+    чтобы воркеры вместе не запускали больше потоков, чем есть ядер.
+    Возвращает лучшие параметры, их метрики и таблицу всех кандидатов.
+    """
+    df = df.sort_values("game_date", kind="stable").reset_index(drop=True)
+    x, y = prepare_data(df)
+    x = x.to_numpy(dtype=float)
+    y = y.to_numpy(dtype=int)
+
+    base_params = load_params(model_name)
+    space = SEARCH_SPACES[model_name]
+    folds = time_series_folds(len(df), n_splits)
+    threads = max(1, (os.cpu_count() or 1) // n_workers)
+
+    logger.info(f"Tuning {model_name}: {search}, {n_workers} workers x {threads} threads")
+
+    with ProcessPoolExecutor(
+        max_workers=n_workers, initializer=init_worker, initargs=(x, y, threads)
+    ) as pool:
+        if search == "grid":
+            results = run_grid(pool, model_name, base_params, space, folds, threads)
+        else:
+            results = run_optuna(
+                pool, model_name, base_params, space, folds, threads, n_trials, n_workers
+            )
+
+    trials = pd.DataFrame([{**c, **m} for c, m in results]).sort_values("log_loss")
+    best, best_metrics = min(results, key=lambda r: r[1]["log_loss"])
+
+    return {**base_params, **best}, best_metrics, trials
+
+
+def main(model_name, search="grid", n_trials=30, n_workers=1, promote_best=False):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    df = load_dataset(DATA_PATH)
+    params, metrics, trials = tune(df, model_name, search, n_trials, n_workers=n_workers)
+
+    TUNING_DIR.mkdir(parents=True, exist_ok=True)
+    trials.to_csv(TUNING_DIR / f"{model_name}_{search}_trials.csv", index=False)
+
+    logger.info(f"Best params: {params}")
+    logger.info(f"CV metrics: {metrics}")
+
+    # лучшая модель дообучается на всех данных и попадает в реестр
+    x, y = prepare_data(df)
+    model = get_model(model_name, params).fit(x, y)
+
+    version = register_model(
+        model_name,
+        model,
+        features=list(x.columns),
+        metrics=metrics,
+        data_hash=data_hash(df),
+        params=params,
+    )
+
+    if promote_best:
+        promote(model_name, version)
+
+    logger.info(f"Registered {model_name} version {version}, promoted: {promote_best}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hyperparameter search for match models")
+    parser.add_argument("model", choices=sorted(SEARCH_SPACES))
+    parser.add_argument("--search", choices=["grid", "optuna"], default="grid")
+    parser.add_argument("--trials", type=int, default=30, help="Optuna trials")
+    parser.add_argument("--workers", type=int, default=1, help="parallel candidate workers")
+    parser.add_argument("--promote", action="store_true", help="make the best model current")
+    args = parser.parse_args()
+
+    main(
+        args.model,
+        search=args.search,
+        n_trials=args.trials,
+        n_workers=args.workers,
+        promote_best=args.promote,
+    )
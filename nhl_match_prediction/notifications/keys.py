@@ -4,3 +4,7 @@ def sent_key(game_id: int, chat_id: int, offset: str):
 
 def scheduled_key(game_id: int, chat_id: int, offset: str):
     return f"notif:scheduled:{game_id}:{chat_id}:{offset}"
+
+
+def scheduled_game_key(game_id: int, offset: str):
+    return f"notif:scheduled:{game_id}:{offset}"
@@ -2,13 +2,18 @@ import pandas as pd
 import redis
 from celery import shared_task
 
-from nhl_match_prediction.upcoming_features.build_upcoming_matches import get_upcoming_matches
-
-from .keys import scheduled_key, sent_key
-from .sender import send_message
+from nhl_match_prediction.serving.store import RedisPredictionStore
+from nhl_match_prediction.upcoming_features.build_upcoming_matches import (
+    get_upcoming_matches,
+    get_upcoming_version,
+)
+
+from .keys import scheduled_game_key, sent_key
+from .sender import send_many, send_message
 from .service import build_message
 
 r = redis.Redis(host="redis", decode_responses=True)
+prediction_store = RedisPredictionStore(r)
 
 
 NOTIFICATION_OFFSETS = [
@@ -16,6 +21,55 @@ NOTIFICATION_OFFSETS = [
     # 1,
 ]
 
+SCHEDULED_TTL = 60 * 60 * 24
+PIPELINE_CHUNK = 1000
+
+
+def load_upcoming_games() -> pd.DataFrame:
+    """
+    Предстоящие матчи из общего кэша прогнозов API, если он посчитан по текущему
+    снимку upcoming_match_features; иначе — из самого снимка
+    """
+    matches = None
+    version = prediction_store.current_version()
+
+    # версия прогнозов — "<версия снимка>:<версия модели>"
+    if version is not None and version.split(":", 1)[0] == get_upcoming_version():
+        matches = prediction_store.load(version)
+
+    df = pd.DataFrame(matches) if matches else get_upcoming_matches()
+
+    if not df.empty:
+        df["game_date"] = pd.to_datetime(df["game_date"], utc=True)
+
+    return df
+
+
+def notification_slots(df: pd.DataFrame, now: pd.Timestamp) -> pd.DataFrame:
+    """Пары (матч, offset), время отправки которых ещё не прошло"""
+    slots = df[["game_id", "game_date"]].merge(
+        pd.DataFrame({"offset": NOTIFICATION_OFFSETS}), how="cross"
+    )
+    slots["send_at"] = slots["game_date"] - pd.to_timedelta(slots["offset"], unit="h")
+
+    return slots[slots["send_at"] >= now]
+
+
+def claim_keys(keys: list[str]) -> list[bool]:
+    """
+    SET NX для всех ключей пачками через pipeline: один round trip на PIPELINE_CHUNK ключей.
+    True, если ключ поставили мы (уведомление ещё не запланировано).
+    """
+    claimed = []
+
+    for start in range(0, len(keys), PIPELINE_CHUNK):
+        pipe = r.pipeline(transaction=False)
+        for key in keys[start : start + PIPELINE_CHUNK]:
+            pipe.set(key, 1, nx=True, ex=SCHEDULED_TTL)
+        claimed.extend(bool(ok) for ok in pipe.execute())
+
+    return claimed
+
 
 @shared_task
 def schedule_notifications():
@@ -24,37 +78,68 @@ def schedule_notifications():
     if not r.set(lock_key, "1", nx=True, ex=50):
         return
 
-    df = get_upcoming_matches()
+    df = load_upcoming_games()
     if df.empty:
         return
 
-    df["game_date"] = pd.to_datetime(df["game_date"], utc=True)
-    now = pd.Timestamp.utcnow()
+    slots = notification_slots(df, pd.Timestamp.utcnow())
+    if slots.empty:
+        return
+
+    jobs = [
+        (int(game_id), int(h), send_at.to_pydatetime())
+        for game_id, h, send_at in zip(
+            slots["game_id"], slots["offset"], slots["send_at"], strict=True
+        )
+    ]
+    claimed = claim_keys([scheduled_game_key(game_id, str(h)) for game_id, h, _ in jobs])
+
+    # одна задача на (матч, offset): подписчики читаются в момент отправки
+    for (game_id, h, send_at), is_new in zip(jobs, claimed, strict=True):
+        if is_new:
+            send_game_notifications.apply_async(args=[game_id, h], eta=send_at)
+
 
+def pending_chat_ids(game_id: int, hours_before: int) -> list[str]:
+    """Подписчики, которым уведомление про этот матч ещё не отправлено (MGET пачками)"""
     users = list(r.smembers("subscribers"))
+    pending = []
 
-    for _, game in df.iterrows():
-        game_id = game["game_id"]
+    for start in range(0, len(users), PIPELINE_CHUNK):
+        chunk = users[start : start + PIPELINE_CHUNK]
+        sent = r.mget([sent_key(game_id, chat_id, hours_before) for chat_id in chunk])
+        pending.extend(chat_id for chat_id, flag in zip(chunk, sent, strict=True) if flag is None)
 
-        for chat_id in users:
-            for h in NOTIFICATION_OFFSETS:
-                send_at = game["game_date"] - pd.Timedelta(hours=h)
+    return pending
 
-                if send_at < now:
-                    continue
 
-                skey = scheduled_key(game_id, chat_id, str(h))
+def mark_sent(game_id: int, chat_ids: list[str], hours_before: int):
+    for start in range(0, len(chat_ids), PIPELINE_CHUNK):
+        pipe = r.pipeline(transaction=False)
+        for chat_id in chat_ids[start : start + PIPELINE_CHUNK]:
+            pipe.set(sent_key(game_id, chat_id, hours_before), 1)
+        pipe.execute()
 
-                if r.exists(skey):
-                    continue
 
-                r.set(skey, 1, ex=60 * 60 * 24)
+@shared_task
+def send_game_notifications(game_id: int, hours_before: int):
+    """Рассылка по одному матчу: матч читается и сообщение собирается единожды"""
+    chat_ids = pending_chat_ids(game_id, hours_before)
+    if not chat_ids:
+        return
 
-                send_game_notification.apply_async(
-                    args=[game_id, chat_id, h], eta=send_at.to_pydatetime()
-                )
+    df = load_upcoming_games()
+    df = df[df["game_id"] == game_id]
 
+    if df.empty:
+        return
+
+    text = build_message(df.to_dict("records"), hours_before)
+
+    mark_sent(game_id, send_many(chat_ids, text), hours_before)
 
+
+# задачи, поставленные в очередь до перехода на рассылку по матчу
 @shared_task
 def send_game_notification(game_id: int, chat_id: int, hours_before: int):
     key = sent_key(game_id, chat_id, hours_before)
@@ -62,16 +147,13 @@ def send_game_notification(game_id: int, chat_id: int, hours_before: int):
     if r.exists(key):
         return
 
-    df = get_upcoming_matches()
+    df = load_upcoming_games()
     df = df[df["game_id"] == game_id]
 
     if df.empty:
         return
 
-    df["game_date"] = pd.to_datetime(df["game_date"], utc=True)
-
     text = build_message(df.to_dict("records"), hours_before)
 
-    send_message(chat_id, text)
-
-    r.set(key, 1)
+    if send_message(chat_id, text):
+        r.set(key, 1)
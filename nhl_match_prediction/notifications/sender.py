@@ -1,21 +1,254 @@
+import asyncio
+import logging
 import os
+import time
 
-import requests
+import aiohttp
+from redis import RedisError
+from redis.asyncio import Redis
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
 if not BOT_TOKEN:
     raise RuntimeError("BOT_TOKEN is not set in environment")
 
+# для нагрузочных тестов можно подставить локальную заглушку
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+REDIS_HOST = os.getenv("REDIS_HOST", "redis")
 
-def send_message(chat_id: int, text: str, reply_markup=None):
-    payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
+logger = logging.getLogger(__name__)
 
-    if reply_markup:
-        payload["reply_markup"] = reply_markup
+# лимиты Telegram: ~30 сообщений в секунду на бота и ~1 в секунду в один чат
+GLOBAL_RATE = 25
+PER_CHAT_INTERVAL = 1.0
 
-    r = requests.post(
-        f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage", json=payload, timeout=10
-    )
+# общий лимит считается по окнам такой длины
+RATE_WINDOW = 0.2
+RATE_KEY = "telegram:rate:{window}"
+PAUSE_KEY = "telegram:paused"
 
-    r.raise_for_status()
+MAX_CONNECTIONS = 20
+MAX_ATTEMPTS = 5
+REQUEST_TIMEOUT = 10
+DEFAULT_RETRY_AFTER = 1.0
+
+
+async def get_retry_after(resp: aiohttp.ClientResponse) -> float:
+    """
+    Пауза из ответа 429: retry_after из JSON Telegram, иначе заголовок Retry-After.
+    429 от прокси или шлюза может прийти без JSON: HTML или пустое тело.
+    """
+    try:
+        data = await resp.json(content_type=None)
+        return float(data["parameters"]["retry_after"])
+    except (ValueError, TypeError, KeyError):
+        pass
+
+    try:
+        return float(resp.headers.get("Retry-After", DEFAULT_RETRY_AFTER))
+    except ValueError:  # Retry-After в виде HTTP-даты
+        return DEFAULT_RETRY_AFTER
+
+
+class TokenBucket:
+    """Лимит отправки внутри процесса; pause() останавливает всех по retry_after"""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RedisRateLimiter:
+    """
+    Лимит отправки, общий для всех процессов: рассылки по разным матчам
+    идут параллельно в воркерах Celery, тогда как лимит Telegram один на бота.
+
+    Время делится на окна RATE_WINDOW секунд; счётчик окна хранится в Redis
+    (INCR и PEXPIRE), в окно проходит не больше rate * RATE_WINDOW запросов.
+    pause() ставит общий ключ паузы, который ждут все отправители.
+    Если Redis недоступен, работает локальный TokenBucket.
+    """
+
+    def __init__(self, client: Redis, rate: float):
+        self.client = client
+        self.limit = max(1, int(rate * RATE_WINDOW))
+        self._local = TokenBucket(rate)
+
+    async def acquire(self):
+        while True:
+            now = time.time()
+            window = int(now / RATE_WINDOW)
+            key = RATE_KEY.format(window=window)
+
+            try:
+                pipe = self.client.pipeline(transaction=False)
+                pipe.pttl(PAUSE_KEY)
+                pipe.incr(key)
+                pipe.pexpire(key, int(RATE_WINDOW * 2000))
+                paused_ms, count, _ = await pipe.execute()
+            except RedisError:
+                logger.warning("Redis is unavailable, falling back to local rate limit")
+                await self._local.acquire()
+                return
+
+            window_end = (window + 1) * RATE_WINDOW
+
+            if paused_ms > 0:
+                await asyncio.sleep(paused_ms / 1000)
+            # ответ, пришедший уже после конца окна, слот не даёт: иначе запросы
+            # из нескольких окон ушли бы пачкой
+            elif count <= self.limit and time.time() < window_end:
+                return
+            else:
+                await asyncio.sleep(max(0.0, window_end - time.time()))
+
+    async def pause(self, seconds: float):
+        await self._local.pause(seconds)
+
+        try:
+            await self.client.set(PAUSE_KEY, 1, px=int(seconds * 1000))
+        except RedisError:
+            logger.warning("Failed to share Telegram pause through Redis")
+
+
+class TelegramSender:
+    """
+    Асинхронная отправка сообщений через один пул соединений aiohttp.
+
+    Любой запрос проходит через общий для всех процессов лимит
+    (RedisRateLimiter; для тестов можно передать TokenBucket), сообщения
+    в один чат уходят не чаще PER_CHAT_INTERVAL. Получив 429, ждём retry_after
+    и повторяем; сетевые ошибки и 5xx повторяются после экспоненциальной паузы.
+    """
+
+    def __init__(self, token: str = BOT_TOKEN, rate: float = GLOBAL_RATE, bucket=None):
+        self.url = f"{TELEGRAM_API_URL}/bot{token}/sendMessage"
+        self.rate = rate
+        self.bucket = bucket
+        self._redis: Redis | None = None
+        self._chat_sent: dict[int | str, float] = {}
+        self._session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self):
+        if self.bucket is None:
+            # клиент redis.asyncio привязан к event loop, поэтому создаётся здесь
+            self._redis = Redis(host=REDIS_HOST)
+            self.bucket = RedisRateLimiter(self._redis, self.rate)
+
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+            self.bucket = None
+
+    async def _wait_chat(self, chat_id):
+        last = self._chat_sent.get(chat_id)
+        if last is not None:
+            await asyncio.sleep(max(0.0, last + PER_CHAT_INTERVAL - time.monotonic()))
+        self._chat_sent[chat_id] = time.monotonic()
+
+    async def send(self, chat_id, text: str, reply_markup=None) -> bool:
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
+
+        if reply_markup:
+            payload["reply_markup"] = reply_markup
+
+        for attempt in range(MAX_ATTEMPTS):
+            await self._wait_chat(chat_id)
+            await self.bucket.acquire()
+
+            try:
+                async with self._session.post(self.url, json=payload) as resp:
+                    if resp.status == 429:  # noqa: PLR2004
+                        retry_after = await get_retry_after(resp)
+                        logger.warning("Telegram rate limit, retry after %s s", retry_after)
+                        await self.bucket.pause(retry_after)
+                        continue
+
+                    if resp.status >= 500:  # noqa: PLR2004
+                        raise aiohttp.ClientResponseError(
+                            resp.request_info, resp.history, status=resp.status
+                        )
+
+                    if resp.status >= 400:  # noqa: PLR2004
+                        # бот заблокирован, чат удалён и т.п. — повтор не поможет
+                        logger.error("Telegram rejected message to %s: %s", chat_id, resp.status)
+                        return False
+
+                    return True
+
+            except (aiohttp.ClientError, TimeoutError):
+                logger.warning("Failed to send to %s, attempt %d", chat_id, attempt + 1)
+                await asyncio.sleep(2**attempt * 0.5)
+
+        logger.error("Giving up sending to %s", chat_id)
+        return False
+
+    async def send_many(self, chat_ids: list, text: str) -> list:
+        """Одно сообщение всем chat_ids конкурентно; возвращает доставленные"""
+        results = await asyncio.gather(
+            *(self.send(chat_id, text) for chat_id in chat_ids), return_exceptions=True
+        )
+
+        delivered = []
+
+        for chat_id, result in zip(chat_ids, results, strict=True):
+            # ошибка одного чата не должна отменять mark_sent для остальных
+            if isinstance(result, BaseException):
+                logger.error("Failed to send to %s", chat_id, exc_info=result)
+            elif result:
+                delivered.append(chat_id)
+
+        return delivered
+
+
+async def _send_many(chat_ids: list, text: str) -> list:
+    async with TelegramSender() as sender:
+        return await sender.send_many(chat_ids, text)
+
+
+def send_many(chat_ids: list, text: str) -> list:
+    """Синхронная обёртка для Celery"""
+    return asyncio.run(_send_many(chat_ids, text))
+
+
+def send_message(chat_id: int, text: str, reply_markup=None) -> bool:
+    async def send():
+        async with TelegramSender() as sender:
+            return await sender.send(chat_id, text, reply_markup)
+
+    return asyncio.run(send())
@@ -0,0 +1,71 @@
+import sqlite3
+from collections.abc import Iterable
+
+# df.to_sql(if_exists="replace") пересоздаёт таблицу без индексов,
+# поэтому индексы объявлены здесь и создаются заново после каждой загрузки
+INDEXES: dict[str, dict[str, tuple[str, ...]]] = {
+    "games": {
+        "idx_games_game_id": ("game_id",),
+        "idx_games_date": ("game_id", "date", "season"),
+    },
+    "team_game_stats": {
+        "idx_tgs_game_id": ("game_id",),
+        "idx_tgs_team_season_date": ("team_id", "game_id"),
+    },
+    "standings_daily": {
+        "idx_standings_lookup": ("team_abbrev", "season_id", "date"),
+        "idx_standings_season": ("season_id",),
+    },
+    "arenas_data": {
+        "idx_arenas_team_abbr": ("team_abbr",),
+    },
+    "team_logo": {
+        "idx_team_logo_team_abbr": ("team_abbr",),
+    },
+    "prediction_history": {
+        # первичный ключ (game_id, model_name, model_version) уже индексирован;
+        # представление predictions ищет строки продвинутых версий
+        "idx_prediction_history_version": ("model_name", "model_version", "game_id"),
+    },
+    "match_features": {
+        "idx_match_features_game_id": ("game_id",),
+        "idx_match_features_game_date": ("game_date",),
+    },
+}
+
+# ANALYZE читает не больше стольких строк на индекс — хватает планировщику
+ANALYSIS_LIMIT = 1000
+
+
+def table_exists(con: sqlite3.Connection, table: str) -> bool:
+    row = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+
+    return row is not None
+
+
+def create_indexes(con: sqlite3.Connection, tables: Iterable[str] | None = None) -> list[str]:
+    """
+    Создаёт объявленные в INDEXES индексы для tables (по умолчанию для всех)
+    и обновляет статистику планировщика. Отсутствующие таблицы пропускаются.
+    Возвращает таблицы, для которых индексы созданы.
+    """
+    tables = INDEXES if tables is None else tables
+    done = []
+
+    con.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT};")
+
+    for table in tables:
+        if not table_exists(con, table):
+            continue
+
+        for name, columns in INDEXES.get(table, {}).items():
+            con.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)});")
+
+        con.execute(f"ANALYZE {table};")
+        done.append(table)
+
+    con.commit()
+
+    return done
@@ -0,0 +1,128 @@
+import hashlib
+import threading
+from collections.abc import Callable
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from nhl_match_prediction.serving.store import RedisPredictionStore, dumps
+
+
+def make_etag(payload: bytes) -> str:
+    return '"' + hashlib.blake2b(payload, digest_size=16).hexdigest() + '"'
+
+
+class PredictionSnapshot:
+    """Посчитанные прогнозы по всем предстоящим матчам одной версии данных и модели"""
+
+    def __init__(self, version: str, matches: list[dict]):
+        self.version = version
+        self.matches = matches
+        self.game_dates = pd.DatetimeIndex(
+            pd.to_datetime([m["game_date"] for m in matches], utc=True)
+        )
+        # отсортированный индекс времени для выборок по интервалу через searchsorted
+        self._order = np.argsort(self.game_dates.asi8, kind="stable")
+        self._sorted_dates = self.game_dates[self._order]
+
+    @cached_property
+    def payload(self) -> bytes:
+        """Весь список в JSON, кодируется один раз на версию"""
+        return dumps(self.matches)
+
+    @cached_property
+    def etag(self) -> str:
+        return make_etag(self.payload)
+
+    def select(self, mask) -> list[dict]:
+        return [self.matches[i] for i in np.flatnonzero(mask)]
+
+    def between(self, start, end, inclusive: str = "left") -> list[dict]:
+        """
+        Матчи, чей game_date попадает в интервал от start до end
+        (границы как inclusive в pandas), в исходном порядке
+        """
+        lo = self._sorted_dates.searchsorted(
+            start, side="left" if inclusive in ("left", "both") else "right"
+        )
+        hi = self._sorted_dates.searchsorted(
+            end, side="right" if inclusive in ("right", "both") else "left"
+        )
+
+        return [self.matches[i] for i in np.sort(self._order[lo:hi])]
+
+
+class PredictionCache:
+    """
+    In-process кэш прогнозов.
+
+    compute() вызывается только при смене version(): после пересборки
+    upcoming_match_features пайплайном или смены модели. Если задан store,
+    версия сначала ищется в Redis, и считает её только один процесс.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[], list[dict]],
+        version: Callable[[], str],
+        store: RedisPredictionStore | None = None,
+    ):
+        self._compute = compute
+        self._version = version
+        self._store = store
+        self._lock = threading.Lock()
+        self._snapshot: PredictionSnapshot | None = None
+        # заранее посчитанная следующая версия, см. prime()
+        self._next: PredictionSnapshot | None = None
+
+    def get(self) -> PredictionSnapshot:
+        version = self._version()
+        snapshot = self._snapshot
+
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        primed = self._next
+        if primed is not None and primed.version == version:
+            self._snapshot, self._next = primed, None
+            return primed
+
+        with self._lock:
+            # пока ждали лок, другой поток мог уже пересчитать
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = PredictionSnapshot(version, self._load_or_compute(version))
+
+            return self._snapshot
+
+    def prime(self, version: str, compute: Callable[[], list[dict]]) -> PredictionSnapshot:
+        """
+        Считает прогнозы будущей версии заранее, не трогая текущую.
+        get() переключится на неё, как только version() её вернёт.
+        """
+        self._next = PredictionSnapshot(version, self._load_or_compute(version, compute))
+        return self._next
+
+    def _load_or_compute(self, version: str, compute: Callable[[], list[dict]] | None = None):
+        compute = compute or self._compute
+
+        if self._store is None:
+            return compute()
+
+        matches = self._store.load(version)
+        if matches is not None:
+            return matches
+
+        if not self._store.acquire(version):
+            matches = self._store.wait(version)
+            if matches is not None:
+                return matches
+
+        matches = compute()
+        self._store.save(version, matches)
+
+        return matches
+
+    def invalidate(self):
+        self._snapshot = None
+        self._next = None
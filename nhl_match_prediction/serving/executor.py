@@ -0,0 +1,37 @@
+import asyncio
+from collections.abc import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CoalescingExecutor:
+    """
+    Ограниченный пул потоков для блокирующей работы (SQLite, pandas, SHAP).
+
+    Одновременные запросы по одинаковому ключу ждут одно и то же вычисление
+    и не ставят в пул свои копии. Event loop при этом не блокируется,
+    поэтому /health отвечает даже под нагрузкой.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="serving")
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, func: Callable, *args):
+        future = self._inflight.get(key)
+
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, func, *args)
+            self._inflight[key] = future
+
+            def forget(done, key=key):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            future.add_done_callback(forget)
+
+        # отмена одного клиента не должна отменять общее вычисление
+        return await asyncio.shield(future)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pandas as pd
+
+from nhl_match_prediction.serving.cache import PredictionSnapshot, make_etag
+from nhl_match_prediction.serving.store import dumps
+
+FEED_TTL = 60
+LIVE_WINDOW = pd.Timedelta(hours=3)
+
+
+def build_feed(snapshot: PredictionSnapshot, now: pd.Timestamp) -> dict:
+    today = now.normalize()
+    tomorrow = today + pd.Timedelta(days=1)
+
+    return {
+        # --- LIVE (начался, но считаем что ещё идёт)
+        "live": snapshot.between(max(today, now - LIVE_WINDOW), now, inclusive="both"),
+        # --- TODAY upcoming
+        "today_upcoming": snapshot.between(now, tomorrow, inclusive="neither"),
+        # --- TOMORROW
+        "tomorrow": snapshot.between(tomorrow, tomorrow + pd.Timedelta(days=1)),
+    }
+
+
+class FeedCache:
+    """
+    Готовый JSON для /predict_feed.
+
+    Корзины live / today_upcoming / tomorrow зависят от текущего времени,
+    поэтому пересчитываются не чаще раза в ttl секунд или при смене версии прогнозов.
+    """
+
+    def __init__(self, ttl: float = FEED_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version: str | None = None
+        self._expires = 0.0
+        self._payload = b""
+        self._etag = ""
+
+    def get(self, snapshot: PredictionSnapshot) -> tuple[bytes, str]:
+        with self._lock:
+            if self._version != snapshot.version or time.monotonic() >= self._expires:
+                self._payload = dumps(build_feed(snapshot, pd.Timestamp.utcnow()))
+                self._etag = make_etag(self._payload)
+                self._version = snapshot.version
+                self._expires = time.monotonic() + self.ttl
+
+            return self._payload, self._etag
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from nhl_match_prediction.modeling.models.logistic import prepare_data
+
+THRESHOLD = 0.5
+TOP_FEATURES = 10
+
+RESPONSE_COLUMNS = [
+    "game_id",
+    "game_date",
+    "home_team_abbr",
+    "away_team_abbr",
+    "home_team_logo",
+    "away_team_logo",
+    "arena",
+]
+
+
+def top_k_impacts(shap_values: np.ndarray, k: int = TOP_FEATURES) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Для каждой строки: индексы top-k признаков по |SHAP| (по убыванию)
+    и доля каждого в сумме |SHAP| этих k признаков, в процентах
+    """
+    abs_values = np.abs(shap_values)
+    k = min(k, abs_values.shape[1])
+
+    top = np.argpartition(-abs_values, k - 1, axis=1)[:, :k]
+    top_abs = np.take_along_axis(abs_values, top, axis=1)
+
+    # порядок внутри top-k: по убыванию |SHAP|, при равенстве по номеру признака
+    order = np.lexsort((top, -top_abs), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_abs = np.take_along_axis(top_abs, order, axis=1)
+
+    total = top_abs.sum(axis=1, keepdims=True)
+    total[total == 0] = 1
+
+    return top, np.round(top_abs / total * 100, 1)
+
+
+def explain(probs: np.ndarray, shap_values: np.ndarray, features: list[str]) -> list[dict]:
+    top, percents = top_k_impacts(shap_values)
+
+    features = np.asarray(features, dtype=object)
+    impacts = np.take_along_axis(shap_values, top, axis=1)
+    directions = np.where(impacts > 0, "positive", "negative").astype(object)
+
+    explanations = [
+        [
+            {"feature": f, "impact": v, "impact_percent": p, "direction": d}
+            for f, v, p, d in zip(*row, strict=True)
+        ]
+        for row in zip(
+            features[top].tolist(),
+            impacts.tolist(),
+            percents.tolist(),
+            directions.tolist(),
+            strict=True,
+        )
+    ]
+
+    return [
+        {"probability": p, "prediction": int(p > THRESHOLD), "explanation": e}
+        for p, e in zip(probs.tolist(), explanations, strict=True)
+    ]
+
+
+def predict_with_explain(df: pd.DataFrame, model, explainer):
+    x, _ = prepare_data(df.drop(columns=["home_team_logo", "away_team_logo"]))
+
+    probs = model.predict_proba(x)[:, 1]
+    shap_values = np.asarray(explainer.shap_values(x), dtype=float)
+
+    return explain(probs, shap_values, list(x.columns))
+
+
+def format_response(df: pd.DataFrame, preds: list):
+    columns = {c: df[c].tolist() for c in RESPONSE_COLUMNS}
+
+    return [
+        {
+            **dict(zip(RESPONSE_COLUMNS, values, strict=True)),
+            "prediction": pred["prediction"],
+            "prediction_prob": pred["probability"],
+            "explanation": pred["explanation"],
+        }
+        for values, pred in zip(zip(*columns.values(), strict=True), preds, strict=True)
+    ]
+
+
+def prepare_matches(df: pd.DataFrame):
+    df = df.rename(columns={"home_logo": "home_team_logo", "away_logo": "away_team_logo"})
+
+    df["game_date"] = pd.to_datetime(df["game_date"], utc=True)
+    df["game_date"] = df["game_date"].dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    return df.reset_index(drop=True)
+
+
+def build_predictions(df: pd.DataFrame, model, explainer) -> list[dict]:
+    """Прогноз и объяснение для всех переданных матчей (сырые строки get_upcoming_matches)"""
+    if df.empty:
+        return []
+
+    df = prepare_matches(df)
+    preds = predict_with_explain(df, model, explainer)
+
+    return format_response(df, preds)
@@ -0,0 +1,196 @@
+import logging
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from nhl_match_prediction.modeling.explain import LinearExplainer
+from nhl_match_prediction.modeling.model_registry import (
+    ModelNotRegisteredError,
+    current_version,
+    load_model,
+)
+from nhl_match_prediction.modeling.models.logistic import prepare_data
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_SIZE = 50
+
+# как часто API проверяет, не продвинута ли в реестре новая версия модели
+MODEL_POLL_INTERVAL = 10
+
+
+class ModelNotReadyError(RuntimeError):
+    pass
+
+
+def sample_background(df: pd.DataFrame, size: int = BACKGROUND_SIZE) -> pd.DataFrame:
+    """Фон для SHAP из сырых строк get_upcoming_matches"""
+    if df.empty:
+        return pd.DataFrame()
+
+    df = df.rename(columns={"home_logo": "home_team_logo", "away_logo": "away_team_logo"})
+    x, _ = prepare_data(df.drop(columns=["home_team_logo", "away_team_logo"]))
+
+    return x.sample(min(size, len(x)))
+
+
+class ModelRegistry:
+    """
+    Текущая модель из реестра моделей и SHAP explainer для API.
+
+    Ничего не грузится при импорте: load() вызывается в фоне на старте
+    приложения (start()) или лениво при первом запросе (get()).
+    Фоновая выборка для SHAP сохраняется на диск и помечается версией модели,
+    поэтому рестарт не ходит в БД. Пока загрузка не закончилась, ready == False.
+    Готовность от данных не зависит: если предстоящих матчей нет, explainer
+    собирается позже, при первом get(), когда строки для фона появятся.
+
+    После старта фоновый поток раз в poll_interval секунд сверяет текущую
+    версию в реестре. Новая модель и её explainer собираются, пока работают прежние,
+    затем вызывается on_load (прогрев кэшей), и только после этого
+    (версия, модель, explainer) подменяются одним присваиванием.
+    Запросы всё это время обслуживает прежняя модель.
+    После подмены вызывается on_switch (оповещение подписчиков про новую модель).
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        model_name: str,
+        background_path: Path,
+        load_background: Callable[[], pd.DataFrame],
+        on_load: Callable[[str, object, LinearExplainer], None] | None = None,
+        on_switch: Callable[[str], None] | None = None,
+        poll_interval: float = MODEL_POLL_INTERVAL,
+    ):
+        self.model_name = model_name
+        self.background_path = background_path
+        self._load_background = load_background
+        self._on_load = on_load
+        self._on_switch = on_switch
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._state: tuple[str, object, LinearExplainer | None] | None = None
+        self.error: str | None = None
+
+    @property
+    def version(self) -> str:
+        """Версия модели, которой сейчас отвечает API"""
+        return self._current()[0]
+
+    @property
+    def ready(self) -> bool:
+        return self._state is not None
+
+    def start(self) -> threading.Thread:
+        self._stopped.clear()
+        thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stopped.set()
+
+    def get(self):
+        _, model, explainer = self._current()
+
+        if explainer is None:
+            _, model, explainer = self._attach_explainer()
+
+        return model, explainer
+
+    def _current(self) -> tuple[str, object, LinearExplainer | None]:
+        state = self._state
+
+        if state is None:
+            self.load()
+            state = self._state
+
+        return state
+
+    def registered_version(self) -> str:
+        try:
+            return current_version(self.model_name)
+        except ModelNotRegisteredError as e:
+            raise ModelNotReadyError(str(e)) from e
+
+    def load(self) -> bool:
+        """Загружает текущую версию из реестра, если она ещё не загружена"""
+        with self._lock:
+            version = self.registered_version()
+
+            if self._state is not None and self._state[0] == version:
+                return False
+
+            model = load_model(self.model_name, version)
+            x_background = self._background(version)
+            explainer = None if x_background.empty else LinearExplainer(model, x_background)
+
+            if self._on_load is not None:
+                try:
+                    self._on_load(version, model, explainer)
+                except Exception:
+                    logger.exception("Warming up model %s failed", version)
+
+            self._state = (version, model, explainer)
+            self.error = None
+
+            logger.info("Model %s loaded, SHAP background: %d rows", version, len(x_background))
+
+            if self._on_switch is not None:
+                try:
+                    self._on_switch(version)
+                except Exception:
+                    logger.exception("Announcing model %s failed", version)
+
+            return True
+
+    def _attach_explainer(self) -> tuple[str, object, LinearExplainer]:
+        """Собирает explainer для модели, загруженной без фона для SHAP"""
+        with self._lock:
+            version, model, explainer = self._state
+
+            if explainer is None:
+                x_background = self._background(version)
+
+                if x_background.empty:
+                    raise ModelNotReadyError("No data for SHAP background")
+
+                explainer = LinearExplainer(model, x_background)
+                self._state = (version, model, explainer)
+
+            return self._state
+
+    def _load_quietly(self):
+        try:
+            self.load()
+        except Exception as e:
+            # при опросе раз в poll_interval одна и та же ошибка пишется в лог один раз
+            if str(e) != self.error:
+                logger.exception("Background model loading failed")
+            self.error = str(e)
+
+    def _watch(self):
+        self._load_quietly()
+
+        while not self._stopped.wait(self.poll_interval):
+            self._load_quietly()
+
+    def _background(self, version: str) -> pd.DataFrame:
+        if self.background_path.exists():
+            saved = joblib.load(self.background_path)
+            if saved["model_version"] == version:
+                return saved["x_background"]
+
+        x_background = sample_background(self._load_background())
+
+        if not x_background.empty:
+            self.background_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.background_path.with_suffix(".tmp")
+            joblib.dump({"model_version": version, "x_background": x_background}, tmp_path)
+            tmp_path.replace(self.background_path)
+
+        return x_background
@@ -0,0 +1,125 @@
+import logging
+import os
+import time
+
+from redis import Redis, RedisError
+
+try:
+    import orjson
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    loads = orjson.loads
+
+except ImportError:  # orjson не установлен — компактный stdlib json
+    import json
+
+    import numpy as np
+
+    def _default(obj):
+        # как OPT_SERIALIZE_NUMPY: только скаляры и массивы numpy, остальное — ошибка
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+    def dumps(obj) -> bytes:
+        # без NaN/Infinity: такой JSON не читают ни orjson, ни браузер
+        return json.dumps(obj, separators=(",", ":"), allow_nan=False, default=_default).encode()
+
+    loads = json.loads
+
+
+logger = logging.getLogger(__name__)
+
+PREDICTIONS_KEY = "predictions:{version}"
+CURRENT_KEY = "predictions:current"
+LOCK_KEY = "predictions:lock:{version}"
+UPDATES_CHANNEL = "predictions:updated"
+REDIS_HOST = os.getenv("REDIS_HOST", "redis")
+
+PREDICTIONS_TTL = 60 * 60 * 24
+LOCK_TTL = 120
+
+
+def publish_update(event: dict, client: Redis | None = None):
+    """
+    Сообщает подписчикам, что прогнозы устарели: новый снимок матчей или новая модель.
+    Без client открывается разовое соединение (процессы пайплайна).
+    """
+    try:
+        if client is not None:
+            client.publish(UPDATES_CHANNEL, dumps(event))
+            return
+
+        with Redis(host=REDIS_HOST, socket_connect_timeout=5) as conn:
+            conn.publish(UPDATES_CHANNEL, dumps(event))
+    except RedisError:
+        logger.exception("Failed to publish predictions update to Redis")
+
+
+class RedisPredictionStore:
+    """
+    Общий для всех воркеров uvicorn и Celery кэш прогнозов в Redis.
+
+    Прогнозы лежат под ключом версии (upcoming_match_features + модель),
+    CURRENT_KEY указывает на последнюю посчитанную версию,
+    каждая новая версия анонсируется в канал UPDATES_CHANNEL.
+    Ошибки Redis не роняют сервис: методы возвращают None/False.
+    """
+
+    def __init__(self, client: Redis, ttl: int = PREDICTIONS_TTL):
+        self.client = client
+        self.ttl = ttl
+
+    def load(self, version: str) -> list[dict] | None:
+        try:
+            payload = self.client.get(PREDICTIONS_KEY.format(version=version))
+        except RedisError:
+            logger.exception("Failed to read predictions from Redis")
+            return None
+
+        return None if payload is None else loads(payload)
+
+    def save(self, version: str, matches: list[dict]):
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(PREDICTIONS_KEY.format(version=version), dumps(matches), ex=self.ttl)
+            pipe.set(CURRENT_KEY, version, ex=self.ttl)
+            pipe.delete(LOCK_KEY.format(version=version))
+            # подписчики (бот) перечитывают прогнозы по событию, без опроса
+            pipe.publish(UPDATES_CHANNEL, dumps({"version": version, "games": len(matches)}))
+            pipe.execute()
+        except RedisError:
+            logger.exception("Failed to write predictions to Redis")
+
+    def current_version(self) -> str | None:
+        try:
+            version = self.client.get(CURRENT_KEY)
+        except RedisError:
+            logger.exception("Failed to read current predictions version from Redis")
+            return None
+
+        return version.decode() if isinstance(version, bytes) else version
+
+    def acquire(self, version: str) -> bool:
+        """Право посчитать версию получает только один процесс"""
+        try:
+            return bool(self.client.set(LOCK_KEY.format(version=version), 1, nx=True, ex=LOCK_TTL))
+        except RedisError:
+            logger.exception("Failed to acquire predictions lock in Redis")
+            return True
+
+    def wait(self, version: str, timeout: float = LOCK_TTL, poll: float = 0.1) -> list[dict] | None:
+        """Ждём, пока другой процесс посчитает и сохранит версию"""
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            matches = self.load(version)
+            if matches is not None:
+                return matches
+            time.sleep(poll)
+
+        return None
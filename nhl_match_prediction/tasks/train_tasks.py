@@ -1,45 +1,34 @@
-import sqlite3
 from pathlib import Path
 
-import joblib
-
+from nhl_match_prediction.db import writer
+from nhl_match_prediction.modeling.factory import get_model
+from nhl_match_prediction.modeling.model_registry import data_hash, promote, register_model
 from nhl_match_prediction.modeling.models.logistic import (
     evaluate_model,
     load_dataset,
     prepare_data,
     time_split,
-    train_logistic,
 )
-from nhl_match_prediction.modeling.models.random_forest import build_model
 
 from .celery_app import celery_app
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
 DATA_PATH = BASE_DIR / "data" / "processed" / "match_features.csv"
-MODEL_DIR = BASE_DIR / "nhl_match_prediction" / "modeling" / "artifacts"
+
+TASK_STARTED_QUERY = "UPDATE tasks SET status=?, started_at=datetime('now') WHERE id=?"
+TASK_FINISHED_QUERY = "UPDATE tasks SET status=?, finished_at=datetime('now'), result=? WHERE id=?"
+TASK_STATUS_UPDATE_QUERY = "UPDATE tasks SET status=? WHERE id=?"
 
 
 def update_task_status(task_id, status, result=None):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    if status == "in_progress":
-        cursor.execute(
-            "UPDATE tasks SET status=?, started_at=datetime('now') WHERE id=?",
-            (status, task_id),
-        )
-    elif status in ["success", "failure"]:
-        cursor.execute(
-            "UPDATE tasks SET status=?, finished_at=datetime('now'), result=? WHERE id=?",
-            (status, result, task_id),
-        )
-    else:
-        cursor.execute(
-            "UPDATE tasks SET status=? WHERE id=?",
-            (status, task_id),
-        )
-    conn.commit()
-    conn.close()
+    with writer(DB_PATH) as conn:
+        if status == "in_progress":
+            conn.execute(TASK_STARTED_QUERY, (status, task_id))
+        elif status in ["success", "failure"]:
+            conn.execute(TASK_FINISHED_QUERY, (status, result, task_id))
+        else:
+            conn.execute(TASK_STATUS_UPDATE_QUERY, (status, task_id))
 
 
 @celery_app.task(bind=True)
@@ -55,25 +44,31 @@ def train_model_task(self, task_id: str, model_type: str = "logistic"):
         update_task_status(task_id, "in_progress")
         print(f"🚀 Task {task_id} started training {model_type} model...")
 
-        MODEL_DIR.mkdir(exist_ok=True)
-        model_path = MODEL_DIR / f"{model_type}_model.joblib"
-
         if model_type == "logistic":
-            metrics = train_logistic(DATA_PATH, model_path)
+            params = {}
         elif model_type == "random_forest":
-            df = load_dataset(DATA_PATH)
-            x, y = prepare_data(df)
-            x_train, x_test, y_train, y_test = time_split(x, y)
-
-            model = build_model(params={"n_estimators": 500, "random_state": 42})
-            model.fit(x_train, y_train)
-
-            metrics = evaluate_model(model, x_test, y_test)
-            joblib.dump(model, model_path)
+            params = {"n_estimators": 500, "random_state": 42}
         else:
             raise ValueError(f"Unknown model_type: {model_type}")
 
-        result = f"Model trained successfully: {metrics}"
+        df = load_dataset(DATA_PATH)
+        x, y = prepare_data(df)
+        x_train, x_test, y_train, y_test = time_split(x, y)
+
+        model = get_model(model_type, params)
+        model.fit(x_train, y_train)
+
+        metrics = evaluate_model(model, x_test, y_test)
+        version = register_model(
+            model_type,
+            model,
+            features=list(x_train.columns),
+            metrics=metrics,
+            data_hash=data_hash(df),
+        )
+        promote(model_type, version)
+
+        result = f"Model {model_type} {version} trained successfully: {metrics}"
         update_task_status(task_id, "success", result=result)
         print(f"✅ Task {task_id} finished")
 
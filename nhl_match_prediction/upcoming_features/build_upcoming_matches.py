@@ -1,46 +1,119 @@
 import sqlite3
+import time
 from pathlib import Path
 
 import pandas as pd
 
+from nhl_match_prediction.db import reader
+from nhl_match_prediction.serving.store import publish_update
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
+# меняется при каждой пересборке upcoming_match_features и указывает на текущий снапшот
+VERSION_PATH = DB_PATH.with_name("upcoming_match_features.version")
+SNAPSHOT_DIR = DB_PATH.with_name("serving")
+SNAPSHOT_TABLE = "upcoming_matches"
+KEEP_SNAPSHOTS = 3
+SNAPSHOT_MMAP_SIZE = 64 * 1024 * 1024
 
+# ------------------------------------------------------------------------------------------
+# UPCOMING GAMES
+# ------------------------------------------------------------------------------------------
 
-def get_upcoming_matches() -> pd.DataFrame:
-    con = sqlite3.connect(str(DB_PATH))
-    con.row_factory = sqlite3.Row
-    con.execute("PRAGMA journal_mode=WAL;")
-    con.execute("PRAGMA synchronous=NORMAL;")
-    con.execute("PRAGMA temp_store=MEMORY;")
-    con.execute("PRAGMA cache_size=1000000;")
-
-    # ------------------------------------------------------------------------------------------
-    # UPCOMING GAMES
-    # ------------------------------------------------------------------------------------------
-
-    df = pd.read_sql_query(
-        """
-        SELECT
-            u.*,
-            h.logo_url AS home_logo,
-            a.logo_url AS away_logo,
-			ar.Arena AS arena
-
-        FROM upcoming_match_features u
-        LEFT JOIN team_logo h
-            ON u.home_team_abbr = h.team_abbr
-        LEFT JOIN team_logo a
-            ON u.away_team_abbr = a.team_abbr
-		LEFT JOIN arenas_data ar
-			ON u.home_team_abbr = ar.team_abbr
-        """,
-        con,
-    )
+UPCOMING_MATCHES_QUERY = """
+    SELECT
+        u.*,
+        h.logo_url AS home_logo,
+        a.logo_url AS away_logo,
+        ar.Arena AS arena
+
+    FROM upcoming_match_features u
+    LEFT JOIN team_logo h
+        ON u.home_team_abbr = h.team_abbr
+    LEFT JOIN team_logo a
+        ON u.away_team_abbr = a.team_abbr
+    LEFT JOIN arenas_data ar
+        ON u.home_team_abbr = ar.team_abbr
+"""
+
+
+def get_upcoming_version() -> str:
+    try:
+        return VERSION_PATH.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return "initial"
+
+
+def mark_upcoming_updated(version: str) -> str:
+    tmp_path = VERSION_PATH.with_suffix(".tmp")
+    tmp_path.write_text(version, encoding="utf-8")
+    tmp_path.replace(VERSION_PATH)
+
+    return version
+
+
+def snapshot_path(version: str) -> Path:
+    return SNAPSHOT_DIR / f"upcoming_{version}.db"
+
+
+def publish_upcoming_snapshot() -> str:
+    """
+    Снимок предстоящих матчей (плюс логотипы и арены) в отдельный маленький SQLite.
+
+    Файл пишется рядом под временным именем и переименовывается, затем
+    VERSION_PATH переключается на новую версию и подписчикам уходит событие
+    в UPDATES_CHANNEL. API читает только снимки, поэтому DROP/CREATE таблиц
+    пайплайном в nhl.db на API не влияет.
+    """
+    df = read_upcoming_matches()
+    version = str(time.time_ns())
+
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    path = snapshot_path(version)
+    tmp_path = path.with_suffix(".tmp")
 
+    con = sqlite3.connect(tmp_path)
+    df.to_sql(SNAPSHOT_TABLE, con, index=False)
+    con.commit()
     con.close()
 
-    return df
+    tmp_path.replace(path)
+    mark_upcoming_updated(version)
+
+    # бот держит ленту прогнозов в кэше, пока не придёт событие
+    publish_update({"upcoming_version": version})
+
+    # старые снимки больше не нужны: открытые файлы на POSIX дочитаются
+    for old in sorted(SNAPSHOT_DIR.glob("upcoming_*.db"))[:-KEEP_SNAPSHOTS]:
+        old.unlink(missing_ok=True)
+
+    return version
+
+
+def read_snapshot(path: Path) -> pd.DataFrame:
+    # immutable: без блокировок и проверок журнала, страницы читаются через mmap
+    con = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+
+    try:
+        con.execute(f"PRAGMA mmap_size={SNAPSHOT_MMAP_SIZE};")
+        return pd.read_sql_query(f"SELECT * FROM {SNAPSHOT_TABLE}", con)
+    finally:
+        con.close()
+
+
+def get_upcoming_matches() -> pd.DataFrame:
+    path = snapshot_path(get_upcoming_version())
+
+    if path.exists():
+        return read_snapshot(path)
+
+    # снимок ещё не публиковался (первый запуск) — читаем напрямую из nhl.db
+    return read_upcoming_matches()
+
+
+def read_upcoming_matches() -> pd.DataFrame:
+    with reader(DB_PATH) as con:
+        return pd.read_sql_query(UPCOMING_MATCHES_QUERY, con)
 
 
 if __name__ == "__main__":
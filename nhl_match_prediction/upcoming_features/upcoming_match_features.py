@@ -1,17 +1,16 @@
 import sqlite3
 from pathlib import Path
 
+from nhl_match_prediction.db import BATCH_CACHE_SIZE, connect
+from nhl_match_prediction.upcoming_features.build_upcoming_matches import publish_upcoming_snapshot
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
 
 
 def upcoming_match_features() -> None:
-    con = sqlite3.connect(str(DB_PATH))
+    con = connect(DB_PATH, cache_size=BATCH_CACHE_SIZE)
     con.row_factory = sqlite3.Row
-    con.execute("PRAGMA journal_mode=WAL;")
-    con.execute("PRAGMA synchronous=NORMAL;")
-    con.execute("PRAGMA temp_store=MEMORY;")
-    con.execute("PRAGMA cache_size=1000000;")
 
     con.execute("DROP TABLE IF EXISTS last_features;")
 
@@ -176,6 +175,8 @@ def upcoming_match_features() -> None:
 
     con.close()
 
+    publish_upcoming_snapshot()
+
 
 if __name__ == "__main__":
     upcoming_match_features()
@@ -2,7 +2,8 @@ from pathlib import Path
 
 import matplotlib.pyplot as plt
 import pandas as pd
-from sqlalchemy import create_engine
+
+from nhl_match_prediction.db import reader
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
@@ -14,23 +15,22 @@ CONF_COLOR = "#EF4444"
 GAMES_COLOR = "#6B7280"
 
 
+ACCURACY_QUERY = """
+    SELECT
+        p.game_id,
+        DATE(p.game_date) as game_day,
+        p.logistic_proba,
+        m.home_win
+    FROM predictions p
+    JOIN games m USING(game_id)
+    WHERE m.home_win IS NOT NULL
+    AND m.game_type IN (1, 2, 3)
+"""
+
+
 def load_data() -> pd.DataFrame:
-    engine = create_engine(f"sqlite:///{DB_PATH}")
-
-    return pd.read_sql(
-        """
-        SELECT
-            p.game_id,
-            DATE(p.game_date) as game_day,
-            p.logistic_proba,
-            m.home_win
-        FROM predictions p
-        JOIN games m USING(game_id)
-        WHERE m.home_win IS NOT NULL
-        AND m.game_type IN (1, 2, 3)
-    """,
-        engine,
-    )
+    with reader(DB_PATH) as con:
+        return pd.read_sql(ACCURACY_QUERY, con)
 
 
 def prepare_predictions(df: pd.DataFrame, threshold: float) -> pd.DataFrame:
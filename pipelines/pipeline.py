@@ -12,7 +12,6 @@ from nhl_match_prediction.player_stats_features.build_player_stats_features impo
 from nhl_match_prediction.standings_features.build_standings_features import (
     build_standings_daily_features,
 )
-from nhl_match_prediction.xg_scores_model.xg_utils import build_xg_dataset, update_xg_features
 from omegaconf import DictConfig
 from pipeline_runner import PipelineRunner
 
@@ -24,6 +23,10 @@ from nhl_match_prediction.etl_pipeline.export_match_features import (
 )
 from nhl_match_prediction.etl_pipeline.json_to_csv import main as json_to_csv_main
 from nhl_match_prediction.etl_pipeline.load_to_db import main as load_sqlite_main
+from nhl_match_prediction.feature_engineering.xg_scores_model.build_xg_game_dataset import (
+    build_xg_dataset,
+    update_xg_features,
+)
 from nhl_match_prediction.upcoming_features.future_games_features import build_future_games_features
 from nhl_match_prediction.upcoming_features.upcoming_match_features import upcoming_match_features
 
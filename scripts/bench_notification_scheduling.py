@@ -0,0 +1,144 @@
+import os
+import time
+
+import fakeredis
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("BOT_TOKEN", "bench")  # sender требует токен при импорте
+
+from nhl_match_prediction.notifications import scheduler
+from nhl_match_prediction.notifications.keys import scheduled_key, sent_key
+from nhl_match_prediction.notifications.service import build_message
+
+N_SUBSCRIBERS = 10_000
+N_GAMES = 4
+
+
+def make_games(n: int, now: pd.Timestamp) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "game_id": 2025020000 + np.arange(n),
+            "game_date": now + pd.to_timedelta(6 + np.arange(n), unit="h"),
+            "home_team_abbr": "BOS",
+            "away_team_abbr": "TOR",
+        }
+    )
+
+
+def legacy_schedule(client, df, users, now, enqueue):
+    """Прежняя реализация: iterrows x подписчики x offsets, exists + set на каждый ключ"""
+    for _, game in df.iterrows():
+        game_id = game["game_id"]
+
+        for chat_id in users:
+            for h in scheduler.NOTIFICATION_OFFSETS:
+                send_at = game["game_date"] - pd.Timedelta(hours=h)
+
+                if send_at < now:
+                    continue
+
+                skey = scheduled_key(game_id, chat_id, str(h))
+
+                if client.exists(skey):
+                    continue
+
+                client.set(skey, 1, ex=60 * 60 * 24)
+
+                enqueue(args=[game_id, chat_id, h], eta=send_at.to_pydatetime())
+
+
+def legacy_send(client, game_id, chat_id, hours_before):
+    """Прежняя задача send_game_notification: отдельная на каждого подписчика"""
+    key = sent_key(game_id, chat_id, hours_before)
+
+    if client.exists(key):
+        return
+
+    df = scheduler.load_upcoming_games()
+    df = df[df["game_id"] == game_id]
+
+    if df.empty:
+        return
+
+    build_message(df.to_dict("records"), hours_before)
+
+    client.set(key, 1)
+
+
+def run(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed:8.2f} s")
+    return elapsed
+
+
+def main():
+    now = pd.Timestamp.utcnow()
+    games = make_games(N_GAMES, now)
+    users = [str(100_000 + i) for i in range(N_SUBSCRIBERS)]
+
+    enqueued = []
+    db_loads = []
+
+    def enqueue(args, eta):
+        enqueued.append((args, eta))
+
+    def load_games():
+        db_loads.append(1)
+        return games
+
+    client = fakeredis.FakeRedis(decode_responses=True)
+    client.sadd("subscribers", *users)
+
+    scheduler.r = client
+    scheduler.load_upcoming_games = load_games
+    scheduler.send_many = lambda chat_ids, text: list(chat_ids)
+    scheduler.send_game_notifications.apply_async = enqueue
+
+    n_slots = N_GAMES * len(scheduler.NOTIFICATION_OFFSETS)
+    n_keys = n_slots * N_SUBSCRIBERS
+    print(f"{N_GAMES} games x {N_SUBSCRIBERS} subscribers = {n_keys} notifications")
+
+    # --- прежняя схема: ключ и задача на каждого подписчика
+    legacy_time = run(
+        "legacy schedule (exists/set)",
+        lambda: legacy_schedule(client, games, users, now, enqueue),
+    )
+    legacy_jobs = list(enqueued)
+    db_loads.clear()
+    legacy_time += run(
+        "legacy per-subscriber tasks",
+        lambda: [legacy_send(client, *args) for args, _ in legacy_jobs],
+    )
+    legacy_db_loads = len(db_loads)
+
+    client.flushall()
+    client.sadd("subscribers", *users)
+    enqueued.clear()
+
+    # --- новая схема: ключ и задача на (матч, offset)
+    new_time = run("schedule per game", scheduler.schedule_notifications)
+    assert len(enqueued) == n_slots
+    db_loads.clear()
+    new_time += run(
+        "fan-out per game",
+        lambda: [scheduler.send_game_notifications(*args) for args, _ in enqueued],
+    )
+    new_db_loads = len(db_loads)
+    assert client.exists(*(sent_key(games["game_id"][0], u, 5) for u in users)) == N_SUBSCRIBERS
+
+    # повторный запуск ничего не ставит: все ключи уже заняты
+    client.delete("notif:lock")
+    enqueued.clear()
+    scheduler.schedule_notifications()
+    assert not enqueued
+
+    print(f"tasks: legacy {len(legacy_jobs)}, fan-out {n_slots}")
+    print(f"games queries: legacy {legacy_db_loads}, fan-out {new_db_loads}")
+    print(f"speedup: {legacy_time / new_time:.1f}x (fakeredis, без сетевой задержки)")
+
+
+if __name__ == "__main__":
+    main()
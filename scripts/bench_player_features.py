@@ -0,0 +1,141 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from nhl_match_prediction.feature_engineering.player_stats_features.player_features import (
+    FULL_GAME_MINUTES,
+    GROUP_KEYS,
+    add_player_features,
+)
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+PLAYER_STATS_PATH = BASE_DIR / "data" / "processed" / "player_stats.csv"
+
+
+def legacy_player_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Прежняя реализация (часть колонок): цикл по группам (game_id, team_id, season)"""
+    features = []
+
+    for (game_id, team_id, season), g in df.groupby(GROUP_KEYS):
+        row = {"game_id": game_id, "team_id": team_id, "season": season}
+
+        row["team_points_total"] = total = g["total_points"].sum()
+        row["team_points_std"] = g["total_points"].std()
+        for out, col in [
+            ("hits_sum", "hits"),
+            ("pim_sum", "pim"),
+            ("takeaways_sum", "takeaways"),
+            ("giveaways_sum", "giveaways"),
+            ("pp_goals_team_sum", "powerPlayGoals"),
+            ("team_last5_points_sum", "last_n_games_points"),
+        ]:
+            row[out] = g[col].sum()
+        row["faceoff_avg"] = g["faceoffWinningPctg"].mean()
+
+        skaters = g[g["position"] != "G"]
+        if not skaters.empty:
+            top3 = skaters.sort_values("total_points", ascending=False).head(3)
+            row["top3_points_sum"] = top3["total_points"].sum()
+            row["top3_toi_sum"] = top3["toi_minutes"].sum()
+            row["top3_points_ratio"] = row["top3_points_sum"] / total if total > 0 else 0
+
+        defense = g[g["position"] == "D"]
+        if not defense.empty:
+            top2_def = defense.sort_values("toi_minutes", ascending=False).head(2)
+            row["top2_defense_toi_sum"] = top2_def["toi_minutes"].sum()
+            row["defense_hits_sum"] = defense["hits"].sum()
+
+        forwards = g[g["position"].isin(["C", "L", "R"])]
+        if not forwards.empty:
+            row["forward_points_sum"] = forwards["total_points"].sum()
+
+        goalies = g[g["position"] == "G"]
+        if not goalies.empty:
+            starter = goalies[goalies["starter"]]
+            goalie = (
+                starter.iloc[0]
+                if not starter.empty
+                else goalies.sort_values("toi_minutes", ascending=False).iloc[0]
+            )
+            row["goalie_toi"] = goalie["toi_minutes"]
+            row["goalie_played_full_game"] = int(goalie["toi_minutes"] >= FULL_GAME_MINUTES)
+
+        features.append(row)
+
+    return pd.DataFrame(features)
+
+
+def make_player_stats(n_games: int, seed: int = 42) -> pd.DataFrame:
+    """Синтетический player_stats: 2 команды x 20 игроков на матч"""
+    rng = np.random.default_rng(seed)
+
+    positions = np.array(["C"] * 4 + ["L"] * 4 + ["R"] * 4 + ["D"] * 6 + ["G"] * 2)
+    n = n_games * 2 * len(positions)
+    pos = np.tile(positions, n_games * 2)
+    is_goalie = pos == "G"
+
+    def skater_stat(high):
+        return np.where(is_goalie, np.nan, rng.integers(0, high, n))
+
+    return pd.DataFrame(
+        {
+            "game_id": np.repeat(np.arange(n_games), 2 * len(positions)),
+            "team_id": np.tile(np.repeat([1, 2], len(positions)), n_games),
+            "season": 20202021 + np.repeat(np.arange(n_games) // 1312, 2 * len(positions)),
+            "position": pos,
+            "total_points": skater_stat(4),
+            "total_goals": skater_stat(3),
+            "total_assists": skater_stat(3),
+            "toi_minutes": np.where(is_goalie, rng.choice([0.0, 60.0], n), rng.random(n) * 25),
+            "pim": rng.integers(0, 4, n),
+            "hits": skater_stat(5),
+            "powerPlayGoals": skater_stat(2),
+            "sog": skater_stat(6),
+            "faceoffWinningPctg": np.where(pos == "C", rng.random(n), np.nan),
+            "blockedShots": skater_stat(4),
+            "giveaways": skater_stat(3),
+            "takeaways": skater_stat(3),
+            "starter": is_goalie & (np.arange(n) % 2 == 0),
+            "goalsAgainst": np.where(is_goalie, rng.integers(0, 6, n), np.nan),
+            "shotsAgainst": np.where(is_goalie, rng.integers(15, 45, n), np.nan),
+            "saves": np.where(is_goalie, rng.integers(10, 40, n), np.nan),
+            "last_n_games_points": rng.integers(0, 8, n),
+        }
+    )
+
+
+def main():
+    if len(sys.argv) > 1:
+        df = pd.read_csv(sys.argv[1])
+    elif PLAYER_STATS_PATH.exists():
+        df = pd.read_csv(PLAYER_STATS_PATH)
+    else:
+        df = make_player_stats(1312 * 3)  # ~3 сезона
+
+    print(f"player_stats rows: {len(df)}")
+
+    start = time.perf_counter()
+    new = add_player_features(df)
+    new_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy = legacy_player_features(df)
+    legacy_time = time.perf_counter() - start
+
+    # сверяем колонки, не зависящие от выбора top-N при ничьих
+    pd.testing.assert_frame_equal(
+        legacy[["game_id", "team_id", "season", "team_points_total", "hits_sum", "goalie_toi"]],
+        new[["game_id", "team_id", "season", "team_points_total", "hits_sum", "goalie_toi"]],
+        check_dtype=False,
+    )
+
+    print(f"legacy groupby loop: {legacy_time:8.2f} s")
+    print(f"vectorized:          {new_time:8.2f} s")
+    print(f"speedup: {legacy_time / new_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from nhl_match_prediction.serving.predictions import THRESHOLD, explain, format_response
+from nhl_match_prediction.serving.store import dumps, loads
+
+N_MATCHES = 1000
+N_FEATURES = 120
+
+
+def legacy_explain(probs, shap_values, features):
+    """Прежняя реализация predict_with_explain (без модели): цикл по строкам"""
+    results = []
+
+    for i in range(len(probs)):
+        feature_impacts = dict(zip(features, shap_values[i], strict=False))
+
+        top_features = sorted(feature_impacts.items(), key=lambda x: abs(x[1]), reverse=True)[:10]
+
+        total = sum(abs(v) for _, v in top_features) or 1
+
+        explanation = [
+            {
+                "feature": f,
+                "impact": float(v),
+                "impact_percent": round(abs(v) / total * 100, 1),
+                "direction": "positive" if v > 0 else "negative",
+            }
+            for f, v in top_features
+        ]
+
+        results.append(
+            {
+                "probability": float(probs[i]),
+                "prediction": int(probs[i] > THRESHOLD),
+                "explanation": explanation,
+            }
+        )
+
+    return results
+
+
+def legacy_format_response(df, preds):
+    output = []
+
+    for i, row in df.iterrows():
+        output.append(
+            {
+                "game_id": row["game_id"],
+                "game_date": row["game_date"],
+                "home_team_abbr": row["home_team_abbr"],
+                "away_team_abbr": row["away_team_abbr"],
+                "home_team_logo": row["home_team_logo"],
+                "away_team_logo": row["away_team_logo"],
+                "arena": row["arena"],
+                "prediction": preds[i]["prediction"],
+                "prediction_prob": preds[i]["probability"],
+                "explanation": preds[i]["explanation"],
+            }
+        )
+
+    return output
+
+
+def make_matches(n: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+
+    df = pd.DataFrame(
+        {
+            "game_id": 2025020000 + np.arange(n),
+            "game_date": "2026-01-01T00:00:00Z",
+            "home_team_abbr": rng.choice(["BOS", "TOR", "NYR", "EDM"], n),
+            "away_team_abbr": rng.choice(["MTL", "CHI", "VAN", "DAL"], n),
+            "home_team_logo": "https://assets.nhle.com/logos/nhl/svg/BOS_light.svg",
+            "away_team_logo": "https://assets.nhle.com/logos/nhl/svg/MTL_light.svg",
+            "arena": "TD Garden",
+        }
+    )
+    features = [f"feature_{i}" for i in range(N_FEATURES)]
+
+    return df, rng.random(n), rng.normal(0, 0.1, (n, N_FEATURES)), features
+
+
+def timed(func, *args, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    df, probs, shap_values, features = make_matches(N_MATCHES)
+    print(f"{N_MATCHES} matches x {N_FEATURES} features")
+
+    legacy, legacy_time = timed(
+        lambda: legacy_format_response(df, legacy_explain(probs, shap_values, features))
+    )
+    new, new_time = timed(lambda: format_response(df, explain(probs, shap_values, features)))
+
+    legacy_json, legacy_json_time = timed(lambda: json.dumps(jsonable_encoder(legacy)).encode())
+    new_json, new_json_time = timed(lambda: dumps(new))
+
+    # ответ тот же: сравниваем после round-trip через JSON
+    assert json.loads(legacy_json) == loads(new_json)
+
+    print(f"explain + format:  legacy {legacy_time * 1000:8.1f} ms   new {new_time * 1000:8.1f} ms")
+    print(
+        f"JSON encoding:     legacy {legacy_json_time * 1000:8.1f} ms"
+        f"   new {new_json_time * 1000:8.1f} ms"
+    )
+    total_speedup = (legacy_time + legacy_json_time) / (new_time + new_json_time)
+    print(f"speedup: {total_speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
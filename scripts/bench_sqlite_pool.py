@@ -0,0 +1,99 @@
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from uuid import uuid4
+
+from nhl_match_prediction.db import ConnectionPool
+
+N_QUERIES = 5000
+N_THREADS = 8
+
+LEGACY_PRAGMAS = [
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA cache_size=1000000;",
+]
+
+
+def make_db(path: Path, n_tasks: int = 10_000) -> list[str]:
+    """Таблица tasks как в scripts/create_tasks_table.py"""
+    ids = [str(uuid4()) for _ in range(n_tasks)]
+
+    con = sqlite3.connect(path)
+    con.execute("""
+        CREATE TABLE tasks (
+            id TEXT PRIMARY KEY, task_type TEXT, status TEXT, created_at TEXT,
+            started_at TEXT, finished_at TEXT, result TEXT
+        )
+    """)
+    con.executemany(
+        "INSERT INTO tasks (id, task_type, status, created_at) "
+        "VALUES (?, 'train_model', 'success', datetime('now'))",
+        [(task_id,) for task_id in ids],
+    )
+    con.commit()
+    con.close()
+
+    return ids
+
+
+def legacy_lookup(path: Path, task_id: str):
+    """Прежний путь: новое соединение + PRAGMA на каждый запрос"""
+    con = sqlite3.connect(path)
+    for pragma in LEGACY_PRAGMAS:
+        con.execute(pragma)
+    row = con.execute("SELECT * FROM tasks WHERE id=?", (task_id,)).fetchone()
+    con.close()
+    return row
+
+
+def pooled_lookup(pool: ConnectionPool, task_id: str):
+    with pool.reader() as con:
+        return con.execute("SELECT * FROM tasks WHERE id=?", (task_id,)).fetchone()
+
+
+def timed(label: str, func, ids: list[str], threads: int = 1) -> float:
+    start = time.perf_counter()
+
+    if threads == 1:
+        for task_id in ids:
+            assert func(task_id) is not None
+    else:
+        with ThreadPoolExecutor(threads) as executor:
+            assert all(row is not None for row in executor.map(func, ids))
+
+    elapsed = time.perf_counter() - start
+    print(f"{label:<30} {elapsed * 1e6 / len(ids):8.1f} us/query")
+    return elapsed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(tmp) / "bench.db"
+        ids = make_db(path)[:N_QUERIES]
+        pool = ConnectionPool(path)
+
+        legacy = timed("legacy connect per query", lambda i: legacy_lookup(path, i), ids)
+        pooled = timed("pooled reader", lambda i: pooled_lookup(pool, i), ids)
+        timed(
+            f"legacy, {N_THREADS} threads",
+            lambda i: legacy_lookup(path, i),
+            ids,
+            threads=N_THREADS,
+        )
+        timed(
+            f"pooled, {N_THREADS} threads",
+            lambda i: pooled_lookup(pool, i),
+            ids,
+            threads=N_THREADS,
+        )
+
+        print(f"speedup (single thread): {legacy / pooled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import os
+import time
+
+import requests
+from aiohttp import web
+
+PORT = 8787
+
+os.environ.setdefault("BOT_TOKEN", "bench")
+os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{PORT}"
+
+from nhl_match_prediction.notifications.sender import TelegramSender, TokenBucket  # noqa: E402
+
+STUB_LATENCY = 0.05
+
+
+def make_stub(throttle_every: int) -> web.Application:
+    """Заглушка Telegram Bot API: задержка ответа и периодический 429 (retry_after)"""
+    state = {"requests": 0, "throttled": 0}
+
+    async def send_message(request: web.Request):
+        state["requests"] += 1
+        n = state["requests"]
+        await asyncio.sleep(STUB_LATENCY)
+
+        if throttle_every and n % throttle_every == 0:
+            state["throttled"] += 1
+            return web.json_response(
+                {"ok": False, "error_code": 429, "parameters": {"retry_after": 1}}, status=429
+            )
+
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendMessage", send_message)
+    app["state"] = state
+    return app
+
+
+def legacy_send(chat_ids: list, text: str) -> int:
+    """Прежний send_message: блокирующий requests.post, новое соединение на каждое сообщение"""
+    for chat_id in chat_ids:
+        requests.post(
+            f"{os.environ['TELEGRAM_API_URL']}/botbench/sendMessage",
+            json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"},
+            timeout=10,
+        )
+    return len(chat_ids)
+
+
+async def main(n_messages: int, rate: float, throttle_every: int):
+    app = make_stub(throttle_every)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+
+    text = "⏰ Матчи через ~5 часов"
+    chat_ids = list(range(n_messages))
+
+    legacy_n = min(n_messages, 100)
+    start = time.perf_counter()
+    await asyncio.to_thread(legacy_send, chat_ids[:legacy_n], text)
+    legacy_rate = legacy_n / (time.perf_counter() - start)
+
+    app["state"].update(requests=0, throttled=0)
+
+    start = time.perf_counter()
+    async with TelegramSender(rate=rate, bucket=TokenBucket(rate)) as sender:
+        delivered = await sender.send_many(chat_ids, text)
+    elapsed = time.perf_counter() - start
+
+    await runner.cleanup()
+
+    assert len(delivered) == n_messages
+    print(f"stub latency {STUB_LATENCY * 1000:.0f} ms, 429 every {throttle_every} requests")
+    print(f"legacy requests.post:  {legacy_rate:8.1f} msg/s ({legacy_n} messages)")
+    state = app["state"]
+    print(
+        f"async sender:          {n_messages / elapsed:8.1f} msg/s ({n_messages} messages, "
+        f"limit {rate}/s, {state['requests']} requests, {state['throttled']} x 429 retried)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пропускная способность TelegramSender")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=200)
+    parser.add_argument("--throttle-every", type=int, default=500)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.messages, args.rate, args.throttle_every))
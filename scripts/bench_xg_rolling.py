@@ -0,0 +1,83 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from nhl_match_prediction.feature_engineering.xg_scores_model.build_xg_game_dataset import (
+    add_rolling_features,
+)
+
+N_TEAMS = 32
+N_GAMES = 1312 * 5  # ~5 регулярных сезонов
+N_RUNS = 5
+
+
+def make_games(n_games: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    home = rng.integers(1, N_TEAMS + 1, n_games)
+    away = (home + rng.integers(1, N_TEAMS, n_games) - 1) % N_TEAMS + 1
+
+    return pd.DataFrame(
+        {
+            "game_id": np.arange(n_games),
+            "game_date": pd.Timestamp("2020-10-01")
+            + pd.to_timedelta(np.sort(rng.integers(0, 5 * 365, n_games)), unit="D"),
+            "home_team_id": home.astype(float),
+            "away_team_id": away.astype(float),
+            "home_xg": rng.gamma(6, 0.5, n_games),
+            "away_xg": rng.gamma(6, 0.5, n_games),
+            "home_shots": rng.integers(15, 45, n_games),
+            "away_shots": rng.integers(15, 45, n_games),
+        }
+    )
+
+
+def legacy_rolling_features(game: pd.DataFrame) -> pd.DataFrame:
+    """Прежняя реализация: lambda на каждую группу, отдельно по дому и выезду"""
+    game = game.sort_values("game_date").reset_index(drop=True)
+
+    for side in ("home", "away"):
+        game[f"{side}_xg_ewm"] = game.groupby(f"{side}_team_id")[f"{side}_xg"].transform(
+            lambda x: x.shift(1).ewm(alpha=0.2).mean()
+        )
+
+    for stat in ("xg", "shots"):
+        for side in ("home", "away"):
+            game[f"{side}_{stat}_last5"] = game.groupby(f"{side}_team_id")[
+                f"{side}_{stat}"
+            ].transform(lambda x: x.shift(1).rolling(5, min_periods=3).mean())
+
+    game["xg_diff_last5"] = game["home_xg_last5"] - game["away_xg_last5"]
+    game["shots_diff_last5"] = game["home_shots_last5"] - game["away_shots_last5"]
+
+    return game
+
+
+def timeit(func, *args, **kwargs):
+    times = []
+    for _ in range(N_RUNS):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main():
+    game = make_games(N_GAMES)
+
+    legacy, legacy_time = timeit(legacy_rolling_features, game)
+    by_venue, by_venue_time = timeit(add_rolling_features, game, by_venue=True)
+    _, team_time = timeit(add_rolling_features, game)
+
+    pd.testing.assert_frame_equal(legacy, by_venue[legacy.columns], check_exact=True)
+
+    print(f"games: {N_GAMES}, best of {N_RUNS}")
+    print(f"legacy lambdas (home/away split): {legacy_time * 1000:8.1f} ms")
+    print(f"engine, by_venue=True:            {by_venue_time * 1000:8.1f} ms")
+    print(f"engine, all team games:           {team_time * 1000:8.1f} ms")
+    print(f"speedup: {legacy_time / team_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
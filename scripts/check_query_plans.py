@@ -0,0 +1,193 @@
+import argparse
+import re
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+from nhl_match_prediction.db import connect
+from nhl_match_prediction.etl_pipeline.team_logo import TEAM_LOGO_QUERY, season_id
+from nhl_match_prediction.modeling.evaluate import EVALUATE_QUERY
+from nhl_match_prediction.modeling.predict import (
+    MISSING_MATCHES_QUERY,
+    PREDICT_FROM,
+    ensure_prediction_tables,
+)
+from nhl_match_prediction.schema import create_indexes, table_exists
+from nhl_match_prediction.tasks.train_tasks import (
+    TASK_FINISHED_QUERY,
+    TASK_STARTED_QUERY,
+    TASK_STATUS_UPDATE_QUERY,
+)
+from nhl_match_prediction.upcoming_features.build_upcoming_matches import UPCOMING_MATCHES_QUERY
+from nhl_match_prediction.visualization.daily_accuracy import ACCURACY_QUERY
+from scripts.create_tasks_table import CREATE_TASKS_TABLE
+from scripts.tasks import TASK_STATUS_QUERY
+
+# полный проход по таблице меньше этого размера не считаем проблемой
+LARGE_TABLE_ROWS = 1000
+
+# (название, запрос, параметры, таблицы, которые запрос и так читает целиком)
+QUERIES = [
+    ("upcoming_matches", UPCOMING_MATCHES_QUERY, (), {"upcoming_match_features"}),
+    ("daily_accuracy", ACCURACY_QUERY, (), {"predictions"}),
+    ("predict_missing", MISSING_MATCHES_QUERY, ("logistic", "", PREDICT_FROM), set()),
+    ("team_logo", TEAM_LOGO_QUERY, (season_id,), set()),
+    ("evaluate", EVALUATE_QUERY, (), {"predictions"}),
+    ("task_status", TASK_STATUS_QUERY, ("",), set()),
+    ("task_started", TASK_STARTED_QUERY, ("", ""), set()),
+    ("task_finished", TASK_FINISHED_QUERY, ("", "", ""), set()),
+    ("task_status_update", TASK_STATUS_UPDATE_QUERY, ("", ""), set()),
+]
+
+# таблицы, которые пайплайн пишет через to_sql: колонки, нужные запросам
+FIXTURE_COLUMNS = {
+    "games": "game_id INTEGER, date TEXT, season INTEGER, game_type INTEGER, home_win INTEGER",
+    "match_features": "game_id INTEGER, game_date TEXT, home_win INTEGER",
+    "standings_daily": (
+        "team_abbrev TEXT, team_name TEXT, team_logo TEXT, season_id TEXT, date TEXT"
+    ),
+    "upcoming_match_features": "home_team_abbr TEXT, away_team_abbr TEXT",
+    "team_logo": "team_abbr TEXT, team_name TEXT, logo_url TEXT",
+    "arenas_data": "team_abbr TEXT, Arena TEXT",
+}
+
+# размеры таблиц для статистики планировщика, порядок как в боевой БД
+FIXTURE_ROWS = {
+    "games": 50_000,
+    "match_features": 50_000,
+    "standings_daily": 200_000,
+    "upcoming_match_features": 32,
+    "team_logo": 32,
+    "arenas_data": 32,
+    "prediction_history": 200_000,
+    "promoted_models": 2,
+    "tasks": 10_000,
+}
+
+SQL_KEYWORDS = {"WHERE", "JOIN", "LEFT", "INNER", "ON", "USING", "GROUP", "ORDER", "LIMIT", "SET"}
+TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+
+def table_aliases(sql: str) -> dict[str, str]:
+    """Алиас (или имя) -> таблица: в плане SQLite показывает алиасы"""
+    aliases = {}
+
+    for table, alias in TABLE_REF.findall(sql):
+        name = alias if alias and alias.upper() not in SQL_KEYWORDS else table
+        aliases[name] = table
+
+    return aliases
+
+
+def table_rows(con: sqlite3.Connection, table: str) -> int:
+    """Число строк по статистике планировщика (sqlite_stat1), без неё — COUNT(*)"""
+    if table_exists(con, "sqlite_stat1"):
+        (rows,) = con.execute(
+            "SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = ?", (table,)
+        ).fetchone()
+        if rows is not None:
+            return rows
+
+    (rows,) = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+
+    return rows
+
+
+def check_query(con: sqlite3.Connection, sql: str, params: tuple, drivers: set) -> list[str]:
+    """Строки плана, на которых запрос нарушает правила; пустой список — всё в порядке"""
+    plan = [row[3] for row in con.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    aliases = table_aliases(sql)
+    problems = []
+
+    for detail in plan:
+        # автоматический индекс строится заново на каждый запрос
+        if "AUTOMATIC" in detail:
+            problems.append(detail)
+            continue
+
+        match = SCAN.match(detail)
+        table = aliases.get(match.group(1)) if match else None
+
+        if table is None or table in drivers:
+            continue
+
+        rows = table_rows(con, table)
+        if rows >= LARGE_TABLE_ROWS:
+            problems.append(f"{detail} ({rows} rows)")
+
+    return problems
+
+
+def build_fixture(path: Path):
+    """
+    Пустая БД: схема и индексы из кода (create_indexes), статистика размеров
+    из FIXTURE_ROWS. Планы те же, что на боевой БД, но данные не нужны.
+    """
+    con = sqlite3.connect(path)
+
+    for table, columns in FIXTURE_COLUMNS.items():
+        con.execute(f"CREATE TABLE {table} ({columns})")
+
+    con.execute(CREATE_TASKS_TABLE)
+    ensure_prediction_tables(con)
+    create_indexes(con)
+
+    # ANALYZE пустых таблиц статистики не даёт: пишем её сами, индексы считаем уникальными
+    con.execute("DELETE FROM sqlite_stat1")
+
+    for table, rows in FIXTURE_ROWS.items():
+        con.execute("INSERT INTO sqlite_stat1 VALUES (?, NULL, ?)", (table, str(rows)))
+
+        for index in con.execute(f"PRAGMA index_list({table})").fetchall():
+            columns = con.execute(f"PRAGMA index_info({index[1]})").fetchall()
+            stat = " ".join([str(rows)] + ["1"] * len(columns))
+            con.execute("INSERT INTO sqlite_stat1 VALUES (?, ?, ?)", (table, index[1], stat))
+
+    con.commit()
+    con.close()
+
+
+def check_db(db_path: Path) -> int:
+    con = connect(db_path, query_only=True)
+    failed = 0
+
+    for name, sql, params, drivers in QUERIES:
+        try:
+            problems = check_query(con, sql, params, drivers)
+        except sqlite3.OperationalError as e:
+            # нет таблицы или колонки: запрос сломается и в проде
+            problems = [str(e)]
+
+        print(f"{'FAIL' if problems else 'OK  '} {name}")
+        for problem in problems:
+            print(f"     {problem}")
+
+        failed += bool(problems)
+
+    con.close()
+
+    return 1 if failed else 0
+
+
+def main(db_path: Path | None = None) -> int:
+    """Проверяет db_path, по умолчанию — временную БД, собранную по схеме из кода"""
+    if db_path is not None:
+        return check_db(db_path)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fixture_path = Path(tmp_dir) / "schema.db"
+        build_fixture(fixture_path)
+
+        return check_db(fixture_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN для запросов API и фичей")
+    parser.add_argument(
+        "--db", type=Path, default=None, help="боевая БД; по умолчанию схема из кода"
+    )
+    args = parser.parse_args()
+
+    sys.exit(main(args.db))
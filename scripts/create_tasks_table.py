@@ -5,14 +5,7 @@ BASE_DIR = Path(__file__).resolve().parents[1]
 DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
 # print(DB_PATH)
 
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
-
-cursor.execute("""
-    DROP TABLE IF EXISTS tasks;
-""")
-
-cursor.execute("""
+CREATE_TASKS_TABLE = """
     CREATE TABLE IF NOT EXISTS tasks (
         id TEXT PRIMARY KEY,          -- UUID задачи
         task_type TEXT NOT NULL,      -- тип задачи (например, train_model)
@@ -23,9 +16,20 @@ cursor.execute("""
         result TEXT,                  -- результат (путь к модели, метрики)
         error TEXT                    -- текст ошибки
     )
-""")
+"""
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        DROP TABLE IF EXISTS tasks;
+    """)
+
+    cursor.execute(CREATE_TASKS_TABLE)
 
-conn.commit()
-conn.close()
+    conn.commit()
+    conn.close()
 
-print("✅ Таблица tasks создана")
+    print("✅ Таблица tasks создана")
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import time
+
+import aiohttp
+import numpy as np
+
+ENDPOINTS = [
+    "/predict_upcoming",
+    "/predict_today",
+    "/predict_feed",
+    "/upcoming_preview",
+    "/accuracy",
+]
+
+
+async def hit(session: aiohttp.ClientSession, url: str) -> float:
+    start = time.perf_counter()
+    async with session.get(url) as resp:
+        await resp.read()
+        resp.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def worker(session, base_url, queue, latencies):
+    while True:
+        try:
+            endpoint = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        latencies[endpoint].append(await hit(session, base_url + endpoint))
+
+
+async def probe_health(session, base_url, stop: asyncio.Event, latencies: list):
+    """Пока идёт нагрузка, раз в 50 мс дёргаем /health"""
+    while not stop.is_set():
+        latencies.append(await hit(session, base_url + "/health"))
+        await asyncio.sleep(0.05)
+
+
+def report(name: str, latencies: list):
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    print(f"{name:<20} n={len(ms):>6}  p50={p50:8.1f} ms  p95={p95:8.1f} ms  p99={p99:8.1f} ms")
+
+
+async def main(base_url: str, concurrency: int, n_requests: int, endpoints: list[str]):
+    queue = asyncio.Queue()
+    for i in range(n_requests):
+        queue.put_nowait(endpoints[i % len(endpoints)])
+
+    latencies = {e: [] for e in endpoints}
+    health = []
+    stop = asyncio.Event()
+
+    connector = aiohttp.TCPConnector(limit=concurrency + 1)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        prober = asyncio.create_task(probe_health(session, base_url, stop, health))
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(worker(session, base_url, queue, latencies) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await prober
+
+    print(f"{n_requests} requests, concurrency {concurrency}: {n_requests / elapsed:.1f} rps")
+    for endpoint, values in latencies.items():
+        report(endpoint, values)
+    if health:
+        report("/health (under load)", health)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест API прогнозов")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url.rstrip("/"), args.concurrency, args.requests, args.endpoints))
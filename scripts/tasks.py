@@ -1,15 +1,17 @@
-import sqlite3
 from pathlib import Path
 from uuid import uuid4
 
 from fastapi import APIRouter
 from pydantic import BaseModel
 
+from nhl_match_prediction.db import reader, writer
 from nhl_match_prediction.tasks.train_tasks import train_model_task
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 DB_PATH = BASE_DIR / "data" / "sql" / "nhl.db"
 
+TASK_STATUS_QUERY = "SELECT * FROM tasks WHERE id=?"
+
 router = APIRouter()
 
 
@@ -20,14 +22,12 @@ class TrainModelRequest(BaseModel):
 def create_task_record(task_type: str) -> str:
     """Создаёт запись в таблице tasks и возвращает task_id"""
     task_id = str(uuid4())
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO tasks (id, task_type, status, created_at) VALUES (?, ?, ?, datetime('now'))",
-        (task_id, task_type, "pending"),
-    )
-    conn.commit()
-    conn.close()
+    with writer(DB_PATH) as conn:
+        conn.execute(
+            "INSERT INTO tasks (id, task_type, status, created_at) "
+            "VALUES (?, ?, ?, datetime('now'))",
+            (task_id, task_type, "pending"),
+        )
     return task_id
 
 
@@ -41,11 +41,8 @@ def train_model(request: TrainModelRequest):
 
 @router.get("/tasks/{task_id}")
 def get_task_status(task_id: str):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM tasks WHERE id=?", (task_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with reader(DB_PATH) as conn:
+        row = conn.execute(TASK_STATUS_QUERY, (task_id,)).fetchone()
     if not row:
         return {"error": "Task not found"}
     keys = ["id", "task_type", "status", "created_at", "started_at", "finished_at", "result"]